@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+import profiling
+import syrup_names
+
+# Anomaly scoring over the full item x month history.
+#
+# Every item's monthly Consumption (and Variance, where sales explain part of it) is compared
+# with that item's own recent months: baseline = median of the previous WINDOW months,
+# spread = their median absolute deviation (MAD). The robust z-score
+#     z = (value - baseline) / (1.4826 * MAD)
+# is not pulled around by the odd bad month the way a mean / std would be. Months scoring
+# high are ranked into a "top leaks" table (app "Top Leaks" page, reconcile_cli top_leaks).
+
+WINDOW = 6
+# Months of history an item needs before it is scored
+MIN_HISTORY = 3
+# |z| above this is flagged
+THRESHOLD = 3.5
+# Scale floor as a share of the baseline, so an item with a perfectly flat history
+# (MAD = 0) is flagged on a real jump and not on rounding noise
+MIN_SCALE_SHARE = 0.1
+
+MEASURES = ["Consumption", "Variance"]
+
+HISTORY_COLUMNS = ["Item Code", "Item Name", "Category", "UOM", "month", "Consumption", "Variance"]
+
+LEAK_COLUMNS = [
+    "Item Code", "Item Name", "Category", "UOM", "month",
+    "Consumption", "Consumption Baseline", "Consumption z",
+    "Variance", "Variance Baseline", "Variance z", "Score",
+]
+
+
+@profiling.timed()
+def item_history(cube, counted_months, syrup=None, cup_skus=None):
+    # cube: reconciliation.build_cube; counted_months: months with a stock take.
+    # Consumption is only real when the month and the month before were both counted
+    # (the cube's first month has no opening count, its last one no closing count).
+    # syrup / cup_skus: reconciliation.syrup_by_month / cup_skus_by_month, for the Variance measure
+    counted = pd.PeriodIndex(pd.unique(pd.Series(counted_months).dropna()), freq="M")
+    months = counted[(counted - 1).isin(counted)]
+    history = cube.reset_index()
+    history = history[history["month"].isin(months)]
+    history = history.assign(Variance=np.nan)
+
+    if syrup is not None and not syrup.empty:
+        # Expected litres -> bottles, so Variance is in the item's own unit (like Consumption)
+        bottle_l = syrup_names.bottle_size_ml(syrup["Syrup Name"].astype(str)).to_numpy() / 1000.0
+        expected = pd.Series(syrup["Consumption (L)"].to_numpy() / bottle_l,
+                             index=pd.MultiIndex.from_frame(syrup[["Item Code", "month"]]))
+        keys = pd.MultiIndex.from_frame(history[["Item Code", "month"]])
+        expected = expected.reindex(keys).to_numpy()
+        history["Variance"] = history["Consumption"].to_numpy() - expected
+
+    parts = [history]
+    if cup_skus is not None and not cup_skus.empty:
+        # Cups and lids are also scored per size (sales map to sizes, not to inventory items)
+        skus = cup_skus[cup_skus["month"].isin(months)]
+        parts.append(pd.DataFrame({
+            "Item Code": skus["sku"],
+            "Item Name": skus["sku"],
+            "Category": "CUPS & LIDS (BY SIZE)",
+            "UOM": "nos",
+            "month": skus["month"],
+            "Consumption": skus["Consumption"],
+            "Variance": skus["Variance"],
+        }))
+    history = pd.concat(parts, ignore_index=True)[HISTORY_COLUMNS]
+    history["Item Code"] = history["Item Code"].astype(str)
+    return history.sort_values(["Item Code", "month"]).reset_index(drop=True)
+
+
+def _baseline(values, groups, window, min_history):
+    # Median and MAD of each row's previous `window` values within its group (NaN until
+    # min_history of them exist). Built from shifted copies, one column per lag.
+    grouped = values.groupby(groups, sort=False)
+    lags = np.column_stack([grouped.shift(k).to_numpy(dtype=float) for k in range(1, window + 1)])
+    enough = (~np.isnan(lags)).sum(axis=1) >= min_history
+    median = np.full(len(values), np.nan)
+    mad = np.full(len(values), np.nan)
+    if enough.any():
+        median[enough] = np.nanmedian(lags[enough], axis=1)
+        mad[enough] = np.nanmedian(np.abs(lags[enough] - median[enough, None]), axis=1)
+    return median, mad
+
+
+@profiling.timed("anomaly score")
+def score(history, window=WINDOW, min_history=MIN_HISTORY):
+    # Adds "<measure> Baseline" and "<measure> z" for every measure
+    scored = history.sort_values(["Item Code", "month"]).reset_index(drop=True)
+    for measure in MEASURES:
+        values = scored[measure].astype(float)
+        median, mad = _baseline(values, scored["Item Code"], window, min_history)
+        scale = np.maximum(1.4826 * mad, MIN_SCALE_SHARE * np.abs(median))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (values.to_numpy() - median) / scale
+        # An all-zero history has no scale at all; such months are left unscored
+        z = np.where(scale > 0, z, np.where(values.to_numpy() == median, 0.0, np.nan))
+        scored[f"{measure} Baseline"] = median
+        scored[f"{measure} z"] = z
+    # Leaks are the upward direction only (more used / less explained than usual)
+    scored["Score"] = scored[[f"{m} z" for m in MEASURES]].max(axis=1)
+    return scored
+
+
+def top_leaks(scored, threshold=THRESHOLD, months=None, limit=None):
+    leaks = scored[scored["Score"] >= threshold]
+    if months is not None:
+        leaks = leaks[leaks["month"].isin(months)]
+    leaks = leaks.sort_values("Score", ascending=False)[LEAK_COLUMNS]
+    return leaks.reset_index(drop=True) if limit is None else leaks.head(limit).reset_index(drop=True)
@@ -1,350 +1,493 @@
+import os
+
 import streamlit as pd_st
 import streamlit as st
 import pandas as pd
-from datetime import timedelta
+from datetime import datetime, timedelta
+
+import anomalies
+import background_refresh
+import derived_cache
+import export
+import filter_index
+import ledger
+import outlets
+import parallel_loader
+import pipeline
+import profiling
+import recipes
+import reconciliation
+import sales_rollup
+import sales_store
+import schema
+import snapshot_cache
+import syrup_matching
+import syrup_names
+import table_render
+from pipeline import get_stock_summary, get_warehouse_summary, preprocess_data, preprocess_sales, preprocess_warehouse
 
 # Set page config
 st.set_page_config(page_title="Stock Checking App", layout="wide")
 
-@st.cache_data
-def load_data():
+# Raw sheets come straight from the snapshot cache (memory-mapped Feather). Everything built
+# from them is a derived_cache table below, keyed by the fingerprints of the sheets it reads.
+# With the background refresher running (background_refresh.py) these reads never download.
+
+@profiling.timed()
+def load_data(outlet=outlets.DEFAULT_OUTLET):
     try:
-        # Stock Take Sheet
-        sheet_id = "1mKcRWrkCMHXOpofdjU1MrwRmhUGaaET8RUOG6eyHAqA"
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
-        stock = pd.read_excel(url)
+        # Stock Take Sheet (served from the local snapshot cache when fresh)
+        stock = snapshot_cache.load_source(outlets.source_for(outlet, "stock"), ttl=background_refresh.read_ttl())
         return stock
     except Exception as e:
         # Fallback or error logging
         st.error(f"Error loading Stock Data: {e}")
         return None
 
-def preprocess_data(stock):
-    if stock is None: return pd.DataFrame()
-    # Standardize columns
-    stock.columns = stock.columns.str.lower().str.strip()
-    
-    # Date conversion
-    if "inventory date :" in stock.columns:
-        stock["inventory date :"] = pd.to_datetime(stock["inventory date :"])
-        stock["month"] = stock["inventory date :"].dt.to_period("M")
-    
-    return stock
-
-def get_stock_summary(stock):
-    if stock.empty: return pd.DataFrame()
-    # We need unique closing stock per item per month.
-    # Key columns for grouping - Group by Item Code and Month ONLY for uniqueness
-    group_cols = ["item code :", "month"]
-    
-    # Aggregation rules: Sum quantity, take first available description/category
-    agg_dict = {
-        "physical quantity :": "sum",
-        "item name :": "first",
-        "category :": "first",
-        "uom :": "first"
-    }
-    
-    # Filter agg_dict to only include columns present in df
-    agg_dict = {k: v for k, v in agg_dict.items() if k in stock.columns}
-    
-    # Aggregate
-    monthly_stock = stock.groupby(group_cols).agg(agg_dict).reset_index()
-    monthly_stock.rename(columns={"physical quantity :": "closing_stock"}, inplace=True)
-    
-    return monthly_stock
-
-@st.cache_data
-def load_warehouse_data():
+@profiling.timed()
+def load_warehouse_data(outlet=outlets.DEFAULT_OUTLET):
     try:
         # Warehouse Issues Sheet
-        sheet_id = "1Cy0A4nQvbaW8GYlqyuiLvob-qed5Lu-GugPNGjSaGF4"
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
-        warehouse = pd.read_excel(url)
+        warehouse = snapshot_cache.load_source(outlets.source_for(outlet, "warehouse"), ttl=background_refresh.read_ttl())
         return warehouse
     except Exception as e:
         st.error(f"Error loading Warehouse Data: {e}")
         return None
 
-def preprocess_warehouse(warehouse):
-    if warehouse is None: return pd.DataFrame()
-    warehouse.columns = warehouse.columns.str.lower().str.strip()
-    if "issue date :" in warehouse.columns:
-        warehouse["issue date :"] = pd.to_datetime(warehouse["issue date :"])
-        warehouse["month"] = warehouse["issue date :"].dt.to_period("M")
-    return warehouse
-
-def get_warehouse_summary(warehouse):
-    if warehouse.empty: return pd.DataFrame()
-    # Group by Item Code and Month to get total issued quantity
-    group_cols = ["item code", "month"]
-    
-    # Aggregation: Sum issue quantity
-    agg_dict = {
-        "issue quantity :": "sum"
-    }
-    
-    # Filter agg_dict
-    agg_dict = {k: v for k, v in agg_dict.items() if k in warehouse.columns}
-    
-    warehouse_summary = warehouse.groupby(group_cols).agg(agg_dict).reset_index()
-    warehouse_summary.rename(columns={"issue quantity :": "supplied_qty", "item code": "item code :"}, inplace=True)
-    
-    return warehouse_summary
-
-@st.cache_data
-def load_sales_data():
+@profiling.timed()
+def load_sales_data(outlet=outlets.DEFAULT_OUTLET):
     try:
-        # Sales Data Sheet (Petpooja)
-        sheet_id = "1WOF03Jicq50xITuKeOvW2I8M-vApAlBSm5IQNLYOuFI"
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
-        # Assuming Data is in 'MULLA HOUSE' sheet, or we try reading the first sheet if that fails?
-        # Keeping sheet_name="MULLA HOUSE" as per original code logic
-        sales = pd.read_excel(url, sheet_name="MULLA HOUSE")
+        # Sales Data Sheet (Petpooja), one tab per outlet (see outlets.json)
+        sales = snapshot_cache.load_source(outlets.source_for(outlet, "sales"), ttl=background_refresh.read_ttl())
         return sales
     except Exception as e:
         st.error(f"Error loading Sales Data: {e}")
         return None
 
-def preprocess_sales(sales):
-    if sales is None: return pd.DataFrame()
-    sales.columns = sales.columns.str.lower().str.strip()
-    # Check for date column variations
-    date_col = next((c for c in sales.columns if "date" in c), None)
-    if date_col:
-        sales["date"] = pd.to_datetime(sales[date_col])
-        sales["month"] = sales["date"].dt.to_period("M")
-    return sales
+@profiling.timed()
+def prefetch_sources(force_refresh=False):
+    # Without the background refresher: refresh all stale snapshots concurrently, inline.
+    # With fresh snapshots it only reads their metadata, and a sheet that turns out
+    # unchanged is not re-parsed (its fingerprint stays the same)
+    # Threads only: worker processes would re-run this script (it is __main__ under streamlit run)
+    return parallel_loader.refresh_all(force_refresh=force_refresh, use_processes=False)
+
+def missing_sources():
+    # Sources with nothing on disk yet (first start), which a render has to wait for
+    return [s for s in snapshot_cache.SOURCES if not snapshot_cache.has_snapshot(s) and sales_store.read_state(s) is None]
+
+# --- Derived tables (derived_cache.py) ---
+# Sources: each sheet of an outlet by content fingerprint. Incremental sales use the store
+# version, which only changes when an ingest added rows. A table is rebuilt only when one of
+# the sheets it reads (directly or through its inputs) changed: a new warehouse issue
+# rebuilds warehouse_frame -> warehouse_summary -> reconciliation_cube -> ..., while
+# stock_summary and the sales tables stay cached.
+
+def sheet_fingerprint(kind):
+    def fingerprint(outlet):
+        source = outlets.source_for(outlet, kind)
+        if kind == "sales" and sales_store.INGEST_MODE == "incremental":
+            return (sales_store.read_state(source) or {}).get("version")
+        return snapshot_cache.fingerprint(source)
+    return fingerprint
+
+for kind in outlets.KINDS:
+    derived_cache.source(kind, sheet_fingerprint(kind))
+# Confirmed recipe syrup -> inventory mappings (python syrup_matching.py --accept), all outlets
+derived_cache.source("syrup_mappings", syrup_matching.mappings_version, params=())
+
+@derived_cache.table(inputs=["stock"])
+def stock_frame(outlet):
+    raw_df = load_data(outlet)
+    if raw_df is None: return None
+    # Outlets can share one stock take; keep this outlet's cost center only
+    return outlets.for_outlet(preprocess_data(raw_df), outlet, "stock")
+
+@derived_cache.table(inputs=["stock_frame"])
+def stock_summary(stock_frame, outlet):
+    return None if stock_frame is None else get_stock_summary(stock_frame)
+
+@derived_cache.table(inputs=["warehouse"])
+def warehouse_frame(outlet):
+    warehouse_df_raw = load_warehouse_data(outlet)
+    if warehouse_df_raw is None: return None
+    return outlets.for_outlet(preprocess_warehouse(warehouse_df_raw), outlet, "warehouse")
+
+@derived_cache.table(inputs=["warehouse_frame"])
+def warehouse_summary(warehouse_frame, outlet):
+    return None if warehouse_frame is None else get_warehouse_summary(warehouse_frame)
+
+@derived_cache.table(inputs=["stock_frame", "stock_summary", "warehouse_summary"])
+def reconciliation_cube(stock_frame, stock_summary, warehouse_summary, outlet):
+    # Opening / Supplied / Closing / Consumption for every (item, month) in one pass,
+    # so sidebar interactions only slice it
+    if stock_frame is None: return None
+    return reconciliation.build_cube(stock_frame, stock_summary, warehouse_summary)
+
+@derived_cache.table(inputs=["stock_frame"])
+def item_index(stock_frame, outlet):
+    # Months, category -> items and item classes (filter_index.py)
+    return None if stock_frame is None else filter_index.build(stock_frame)
+
+@derived_cache.table(inputs=["reconciliation_cube"], params=["outlet", "month"])
+def month_frame(reconciliation_cube, outlet, month):
+    # master_df: the cube's rows for one month (Opening Stock = previous month's closing)
+    return reconciliation.month_slice(reconciliation_cube, month)
+
+@derived_cache.table(inputs=["month_frame"], params=["outlet", "month", "categories", "items"])
+def month_view(month_frame, outlet, month, categories, items):
+    # master_df narrowed to the sidebar's categories / items (Stock Overview, Warehouse Supply)
+    view = month_frame
+    if categories:
+        view = view[view["Category"].isin(categories)]
+    if items:
+        view = view[view["Item Name"].isin(items)]
+    return view
+
+@derived_cache.table(inputs=["sales"], params=["outlet", "month"])
+def month_rollup(outlet, month):
+    # (month, item, category, order type) quantities - what every recipe deduction joins against
+    try:
+        source = outlets.source_for(outlet, "sales")
+        if sales_store.INGEST_MODE == "incremental":
+            # Only the partition files for this month are read (prefetch_sources ingests)
+            if sales_store.read_state(source) is None: return None
+            return sales_rollup.rollup_sales(preprocess_sales(sales_store.read_month(str(month), source)))
+
+        # Full mode: re-read and re-preprocess the whole snapshot
+        sales_df_raw = load_sales_data(outlet)
+        if sales_df_raw is None: return None
+        sales_df = preprocess_sales(sales_df_raw)
+        return sales_rollup.rollup_sales(sales_df[sales_df["month"] == month])
+    except ValueError as e:
+        st.error(str(e))
+        return None
+
+@derived_cache.table(inputs=["sales"])
+def expected_by_month(outlet):
+    # Recipe consumption of every ingredient for every month (None without sales data)
+    try:
+        rollup = sales_rollup.rollup_sales(pipeline.load_outlet_sales(outlet, ttl=background_refresh.read_ttl()))
+        return recipes.expected_consumption(load_recipe_book(), rollup, by="month")
+    except Exception as e:
+        st.warning(f"Sales data unavailable, recipe consumption counts as 0: {e}")
+        return None
+
+def of_kind(expected, *kinds):
+    return None if expected is None else expected[expected["kind"].isin(kinds)]
+
+@derived_cache.table(inputs=["stock_frame", "warehouse_frame", "sales", "syrup_mappings"])
+def daily_ledger(stock_frame, warehouse_frame, outlet):
+    # Daily event stream (stock takes, issues, syrup deductions) with running balances
+    if stock_frame is None: return None
+
+    deductions = None
+    try:
+        sales = pipeline.load_outlet_sales(outlet, ttl=background_refresh.read_ttl())
+        daily = sales_rollup.rollup_sales(sales.assign(day=sales["date"].dt.normalize()), period="day")
+        deductions = ledger.syrup_deductions(daily, load_recipe_book(), stock_frame)
+    except Exception as e:
+        st.warning(f"Sales deductions unavailable: {e}")
+
+    return ledger.build_ledger(stock_frame, warehouse_frame, deductions)
+
+@derived_cache.table(inputs=["stock_frame", "reconciliation_cube", "expected_by_month"])
+def cup_sku_report(stock_frame, reconciliation_cube, expected_by_month, outlet):
+    # Cups and lids per size, every month (recipes.csv size rules vs inventory SKUs)
+    if stock_frame is None or reconciliation_cube is None: return None
+    return reconciliation.cup_skus_by_month(reconciliation_cube, stock_frame, of_kind(expected_by_month, "cup", "lid"))
+
+@derived_cache.table(inputs=["stock_frame", "reconciliation_cube", "expected_by_month", "cup_sku_report", "syrup_mappings"])
+def anomaly_scores(stock_frame, reconciliation_cube, expected_by_month, cup_sku_report, outlet):
+    # Every item x month scored against the item's own history
+    if stock_frame is None or reconciliation_cube is None: return None
+    history = anomalies.item_history(
+        reconciliation_cube, stock_frame["month"].unique(),
+        syrup=reconciliation.syrup_by_month(reconciliation_cube, of_kind(expected_by_month, "syrup")),
+        cup_skus=cup_sku_report,
+    )
+    return anomalies.score(history)
+
+@derived_cache.table(inputs=["month_frame", "month_rollup", "item_index"], params=["outlet", "month", "cup_items"])
+def cup_totals(month_frame, month_rollup, item_index, outlet, month, cup_items):
+    # Sales vs inventory side of the Cup page; cup_items: the inventory items counted
+    # Rows were tagged cup-consuming at preprocessing (recipes.csv cup rules, takeaway orders only)
+    # 1 cup per beverage sold (registry rule)
+    total_sales_cups = recipes.expected_consumption(load_recipe_book(), month_rollup, kind="cup")["expected_qty"].sum()
+    s_df = month_rollup[month_rollup["cup_consuming"].astype(bool)]
+    sales_breakdown = s_df.groupby("item_name")["qty"].sum().reset_index().sort_values("qty", ascending=False)
+    sales_breakdown.columns = ["Beverage", "Qty Sold"]
+
+    inventory_cups_df = month_frame[month_frame["Item Name"].isin(cup_items)].copy()
+    total_opening = inventory_cups_df["Opening Stock"].sum()
+    total_supplied = inventory_cups_df["Supplied Qty"].sum()
+    total_closing = inventory_cups_df["Closing Stock"].sum()
+
+    # Logic: Opening + Supplied - Consumed(Sales) should be Closing
+    # So Variance = (Opening + Supplied - Consumed) - Actual Closing
+    # Or Missing = Expected Closing - Actual Closing
+    total_available = total_opening + total_supplied
+    expected_closing = total_available - total_sales_cups
+    missing_cups = expected_closing - total_closing
+
+    summary = pd.DataFrame({
+        "Metric": [
+            "Opening Stock (Inventory)", 
+            "Supplied (Warehouse)", 
+            "Total Available", 
+            "Consumed (Sales Calculation)", 
+            "Expected Closing Stock", 
+            "Actual Closing Stock (Inventory)", 
+            "Missing / Variance"
+        ],
+        "Quantity": [
+            total_opening, 
+            total_supplied, 
+            total_available, 
+            total_sales_cups, 
+            expected_closing, 
+            total_closing, 
+            missing_cups
+        ]
+    })
+    return {
+        "sales_cups": total_sales_cups,
+        "sales_breakdown": sales_breakdown,
+        "inventory": inventory_cups_df,
+        "opening": total_opening,
+        "supplied": total_supplied,
+        "closing": total_closing,
+        "available": total_available,
+        "missing": missing_cups,
+        "summary": summary,
+    }
+
+@derived_cache.table(inputs=["month_frame", "item_index"], params=["outlet", "month"])
+def syrup_inventory(month_frame, item_index, outlet, month):
+    # The month's syrup stock, converted to litres
+    syrup_inv = month_frame[month_frame["Item Name"].isin(item_index["classes"]["syrup"])].copy()
+    if syrup_inv.empty: return syrup_inv
+
+    # Bottle Size, computed once per unique name
+    syrup_inv["Bottle Size (ml)"] = syrup_names.bottle_size_ml(syrup_inv["Item Name"])
+
+    # --- Convert Everything to Liters ---
+    syrup_inv["Opening Stock (L)"] = (syrup_inv["Opening Stock"] * syrup_inv["Bottle Size (ml)"]) / 1000.0
+    syrup_inv["Supplied Qty (L)"] = (syrup_inv["Supplied Qty"] * syrup_inv["Bottle Size (ml)"]) / 1000.0
+    syrup_inv["Total Available (L)"] = syrup_inv["Opening Stock (L)"] + syrup_inv["Supplied Qty (L)"]
+    return syrup_inv
+
+@derived_cache.table(inputs=["syrup_inventory", "month_rollup", "item_index", "syrup_mappings"], params=["outlet", "month"])
+def syrup_reconciliation(syrup_inventory, month_rollup, item_index, outlet, month):
+    # Syrup stock with the month's recipe consumption deducted (None without sales data)
+    if month_rollup is None or syrup_inventory.empty: return None
+    recipe_book = load_recipe_book()
+
+    # One sparse matrix-vector product over the aggregated sales instead of a merge per sales line
+    expected = recipes.expected_consumption(recipe_book, month_rollup, kind="syrup")
+    expected = expected[expected["expected_qty"] > 0]
+    sales_consumption = expected.rename(columns={"ingredient": "syrup_name", "expected_qty": "total_ml"})[["syrup_name", "total_ml"]]
+    sales_consumption["Sales Consumption (L)"] = sales_consumption["total_ml"] / 1000.0
+
+    # Recipe syrup -> inventory item (syrup_mappings.json, else best fuzzy candidate over all months' syrups)
+    recipe_syrups = recipe_book["ingredients"].index[recipe_book["ingredients"]["kind"] == "syrup"]
+    syrup_matches = load_syrup_matches(tuple(recipe_syrups), tuple(item_index["classes"]["syrup"]), syrup_matching.mappings_version())
+    sales_consumption["Item Name"] = sales_consumption["syrup_name"].map(syrup_matching.mapping(syrup_matches))
+    # "Vanilla" and "Vanilla Syrup" map to the same bottle; sum them so the inventory row is not duplicated
+    sales_consumption = sales_consumption.groupby("Item Name", as_index=False)["Sales Consumption (L)"].sum()
+
+    # Merge Sales Consumption into Inventory
+    with profiling.span("syrup merge", rows=len(syrup_inventory)):
+        syrup_inv = syrup_inventory.assign(**{"Item Name": syrup_inventory["Item Name"].astype(str)})
+        merged = syrup_inv.merge(sales_consumption, on="Item Name", how="left")
+        merged["Sales Consumption (L)"] = merged["Sales Consumption (L)"].fillna(0)
+
+    # Closing Stock = Total Available - Consumption
+    merged["Closing Stock (L)"] = merged["Total Available (L)"] - merged["Sales Consumption (L)"]
+
+    # Rename for Display to match request
+    # Request: syrup name , supplied qty , total available , closing stock , consumption
+    return merged.rename(columns={
+        "Item Name": "Syrup Name",
+        "Sales Consumption (L)": "Consumption (L)",
+    })
+
+@profiling.timed()
+@st.cache_data
+def load_syrup_matches(ingredients, inventory_names, mappings_version):
+    # Recipe syrup -> inventory item; the trigram index is built once per set of inventory names.
+    # mappings_version (syrup_matching.mappings_version()) only keys the cache: a newly confirmed
+    # mapping is used without a restart
+    return syrup_matching.resolve(list(ingredients), syrup_matching.build_index(list(inventory_names)))
+
+@profiling.timed()
+@st.cache_resource
+def load_recipe_book():
+    # recipes.csv compiled into sparse beverage x ingredient matrices (loaded once per process)
+    return recipes.compile_registry(recipes.load_registry())
+
+def export_tables(outlet, index, month):
+    # One month's tables as the pages show them (all categories, every cup / lid item), for export.py.
+    # Built in a scratch cache: exporting many months does not fill the shared one
+    month = pd.Period(month, freq="M")
+    scratch = derived_cache.scratch("month")
+    master_df = derived_cache.get("month_frame", _scratch=scratch, outlet=outlet, month=month)
+    tables = {
+        "stock": master_df,
+        "coffee": master_df[master_df["Item Name"].isin(index["classes"]["coffee"])],
+        "syrup": derived_cache.get("syrup_reconciliation", _scratch=scratch, outlet=outlet, month=month),
+    }
+    if derived_cache.get("month_rollup", _scratch=scratch, outlet=outlet, month=month) is not None:
+        cup_items = tuple(filter_index.class_items(index, "cup", "lid"))
+        cups = derived_cache.get("cup_totals", _scratch=scratch, outlet=outlet, month=month, cup_items=cup_items)
+        tables.update(cup_summary=cups["summary"], cup_sales=cups["sales_breakdown"], cup_inventory=cups["inventory"])
+    return tables
 
 def main():
     st.title("Stock Opening & Closing Checker")
     
     # Sidebar Navigation
-    page = st.sidebar.radio("Navigate", ["Stock Overview", "Warehouse Supply", "Coffee Consumption", "Syrup Consumption", "Cup Consumption"])
+    page = st.sidebar.radio("Navigate", ["Stock Overview", "Warehouse Supply", "Coffee Consumption", "Syrup Consumption", "Cup Consumption", "Daily Ledger", "Top Leaks"])
     
-    # Load Data
-    raw_df = load_data()
-    warehouse_df_raw = load_warehouse_data()
-    sales_df_raw = load_sales_data()
+    # Forced refresh: check every sheet now instead of waiting for the next scheduled check
+    force_refresh = st.sidebar.button("🔄 Refresh Data", help="Check all sheets for changes now, ignoring the snapshot TTL")
+
+    # Timing spans for this run (shown in the debug panel at the bottom of the sidebar),
+    # only recorded while the toggle is on
+    debug = st.sidebar.toggle("🐞 Debug timings", key="debug_timings", help="Time loaders, preprocessing and page rendering; export the trace as JSON")
+    if debug:
+        trace = profiling.start_trace(page, memory=True)
+    else:
+        profiling.stop_trace()
+
+    # Load Data (all three sources fetched/parsed in parallel, partial results kept).
+    # The background refresher does it off the render path; a render only waits on a
+    # first start, when there is no snapshot to show yet
+    if background_refresh.ENABLED:
+        background_refresh.start()
+        if force_refresh:
+            background_refresh.refresh_now()
+        if background_refresh.latest() is None and missing_sources():
+            with st.spinner("Downloading the sheets for the first time..."):
+                background_refresh.wait_for_first_cycle()
+        latest = background_refresh.latest()
+        load_report = latest["report"] if latest and latest["report"] is not None else pd.DataFrame(columns=parallel_loader.REPORT_COLUMNS)
+        if latest and latest["error"]:
+            st.sidebar.warning(f"Background refresh failed: {latest['error']}")
+    else:
+        load_report = prefetch_sources(force_refresh)
+    for _, failed in load_report[load_report["Status"].isin(["failed", "offline"])].iterrows():
+        st.sidebar.warning(f"{failed['Source']}: {failed['Status']} ({failed['Error']})")
+
+    # Outlet picker (only when outlets.json lists more than one)
+    outlet = outlets.DEFAULT_OUTLET
+    if len(outlets.OUTLETS) > 1:
+        outlet = st.sidebar.selectbox("Outlet", list(outlets.OUTLETS), format_func=outlets.label, key="outlet_select")
+    df = derived_cache.get("stock_frame", outlet=outlet)
+
+    as_of = background_refresh.data_as_of(outlet)
+    if as_of is not None:
+        stamp = f"🕒 Data as of {datetime.fromtimestamp(as_of):%Y-%m-%d %H:%M}"
+        if background_refresh.is_refreshing():
+            stamp += " (checking for updates...)"
+        elif force_refresh and background_refresh.ENABLED:
+            stamp += " (refresh started, new data shows on the next rerun)"
+        st.sidebar.caption(stamp)
+    for source in snapshot_cache.SOURCES:
+        st.sidebar.caption(snapshot_cache.describe_snapshot(source))
     
-    if raw_df is None:
+    if df is None:
         st.error("File `Stock Take.xlsx` not found.")
         st.stop()
-        
-    df = preprocess_data(raw_df)
-    
-    stock_summary = get_stock_summary(df)
+
+    cube = derived_cache.get("reconciliation_cube", outlet=outlet)
+    index = derived_cache.get("item_index", outlet=outlet)
     
     # Common Sidebar Filters
     st.sidebar.header("Filters")
     
     # Month Filter
-    available_months = df["month"].unique().astype(str)
-    available_months = sorted(available_months, reverse=True)
+    available_months = index["months"]
     selected_month_str = st.sidebar.selectbox("Select Month", available_months, key="month_select")
     selected_month = pd.Period(selected_month_str, freq="M")
     
     # Category Filter (Only show for pages that are generic)
-    if page in ["Stock Overview", "Warehouse Supply", "Coffee Consumption", "Syrup Consumption"]:
-        available_categories = df["category :"].dropna().unique()
+    if page in ["Stock Overview", "Warehouse Supply", "Coffee Consumption", "Syrup Consumption", "Daily Ledger", "Top Leaks"]:
+        available_categories = index["categories"]
         selected_categories = st.sidebar.multiselect("Select Category", available_categories, default=available_categories, key="category_select")
         
-        # Item Filter logic (shared)
-        if selected_categories:
-            available_items = df[df["category :"].isin(selected_categories)]["item name :"].dropna().unique()
-        else:
-            available_items = df["item name :"].dropna().unique()
-        selected_items = st.sidebar.multiselect("Select Item", sorted(available_items), key="item_select")
+        # Item Filter logic (shared, precomputed category -> items)
+        available_items = filter_index.items_for(index, selected_categories)
+        selected_items = st.sidebar.multiselect("Select Item", available_items, key="item_select")
 
-    # Calculate Opening Stock (Previous Month Closing)
+    # Opening Stock is the previous month's closing (precomputed in the cube)
     previous_month = selected_month - 1
-    prev_month_data = stock_summary[stock_summary["month"] == previous_month].copy()
-    prev_month_data = prev_month_data.set_index("item code :")
-    
-    # Current Month Closing
-    current_month_data = stock_summary[stock_summary["month"] == selected_month].copy()
-    current_month_data = current_month_data.set_index("item code :")
-
-    # Helper to build Supply DF
-    def build_supply_df(w_raw, selected_m):
-        if w_raw is None: return pd.DataFrame()
-        w_df = preprocess_warehouse(w_raw)
-        w_summary = get_warehouse_summary(w_df)
-        curr_supply = w_summary[w_summary["month"] == selected_m].copy()
-        return curr_supply.set_index("item code :")
-
-    current_month_supply = build_supply_df(warehouse_df_raw, selected_month)
-
-    # Master Data Construction (Opening + Closing + Supply)
-    # Union of all relevant items
-    all_items = prev_month_data.index.union(current_month_supply.index).union(current_month_data.index)
-    
-    master_df = pd.DataFrame(index=all_items)
-    
-    # Metadata Map
-    # Map item names from stock data first (most reliable)
-    master_item_map = df[["item code :", "item name :", "category :", "uom :"]].drop_duplicates("item code :").set_index("item code :")
-    
-    master_df["Item Name"] = master_item_map["item name :"]
-    master_df["Category"] = master_item_map["category :"]
-    master_df["UOM"] = master_item_map["uom :"]
-    
-    # Fill Data
-    master_df["Opening Stock"] = prev_month_data["closing_stock"].fillna(0)
-    master_df["Supplied Qty"] = current_month_supply["supplied_qty"].fillna(0) if not current_month_supply.empty else 0
-    master_df["Closing Stock"] = current_month_data["closing_stock"].fillna(0)
-    
-    # Consumption Logic
-    master_df["Total Available"] = master_df["Opening Stock"] + master_df["Supplied Qty"]
-    master_df["Consumption"] = master_df["Total Available"] - master_df["Closing Stock"]
-    # Handle negative consumption (data error or adjustment) ? For now leave as is or clip at 0
-    # master_df["Consumption"] = master_df["Consumption"].clip(lower=0) 
-
-    master_df.index.name = "Item Code"
-    master_df = master_df.reset_index()
+    master_df = derived_cache.get("month_frame", outlet=outlet, month=selected_month)
+    profiling.memory_snapshot("stock frame", df)
+    profiling.memory_snapshot("reconciliation cube", cube)
+    profiling.memory_snapshot("month slice", master_df)
 
+    page_span = profiling.begin(f"page: {page}")
     if page == "Stock Overview":
         st.subheader(f"Stock Data for {selected_month_str}")
         st.write(f"**Opening Stock Source**: Closing of {previous_month}")
         
-        # Filtering
-        if selected_categories:
-            master_df = master_df[master_df["Category"].isin(selected_categories)]
-        if selected_items:
-            master_df = master_df[master_df["Item Name"].isin(selected_items)]
+        # Filtering (a derived table per filter state; the page shows one slice of it)
+        view_params = {"outlet": outlet, "month": selected_month, "categories": tuple(selected_categories), "items": tuple(selected_items)}
+        master_df = derived_cache.get("month_view", **view_params)
             
         cols = ["Item Code", "Item Name", "Category", "Opening Stock", "Closing Stock", "UOM"]
-        st.dataframe(master_df[cols], use_container_width=True)
+        table_render.render(master_df[cols], "stock_table", state=derived_cache.key("month_view", view_params),
+                            formats={"Opening Stock": "%,.2f", "Closing Stock": "%,.2f"})
 
     elif page == "Warehouse Supply":
         st.subheader(f"Warehouse Supply & Availability for {selected_month_str}")
         
-        if warehouse_df_raw is None:
+        if derived_cache.get("warehouse_frame", outlet=outlet) is None:
             st.warning("Warehouse data file missing.")
         
         # Filtering
-        if selected_categories:
-            master_df = master_df[master_df["Category"].isin(selected_categories)]
-        if selected_items:
-            master_df = master_df[master_df["Item Name"].isin(selected_items)]
+        view_params = {"outlet": outlet, "month": selected_month, "categories": tuple(selected_categories), "items": tuple(selected_items)}
+        master_df = derived_cache.get("month_view", **view_params)
             
         cols = ["Item Code", "Item Name", "Category", "Opening Stock", "Supplied Qty", "Total Available", "UOM"]
-        st.dataframe(master_df[cols], use_container_width=True)
+        table_render.render(master_df[cols], "warehouse_table", state=derived_cache.key("month_view", view_params),
+                            formats={c: "%,.2f" for c in cols[3:6]})
         
     elif page == "Cup Consumption":
         st.subheader(f"🥤 Cup Consumption Reconciliation for {selected_month_str}")
         
-        if sales_df_raw is None:
+        sales_agg = derived_cache.get("month_rollup", outlet=outlet, month=selected_month)
+        profiling.memory_snapshot("month sales rollup", sales_agg)
+        if sales_agg is None:
             st.error("Sales data file `Mulla House ( AUG - DEC 18 ) PetPooja.xlsx` not found.")
         else:
-            sales_df = preprocess_sales(sales_df_raw)
             
             # ---------------------------------------------------------
-            # 1. SALES SIDE (Expected Consumption)
+            # 1. SALES SIDE (Expected Consumption) and 2. INVENTORY SIDE (Actual Stock)
             # ---------------------------------------------------------
-            # Categories defined by user
-            cup_categories = [
-                "coffee", "cold coffee", "iced coffee", "chocolate", "hot brews [o]",
-                "tea", "manual brews", "tasteful infusions (non coffee) [o]",
-                "juices", "iced coffees [o]", "manual brews [o]",
-                "monsoon special beverages [o]", "beverages [o]", "little ones [o]", "smoothies(o)"
-            ]
-            
-            # Normalize sales categories
-            sales_df["category_clean"] = sales_df["category"].astype(str).str.lower().str.strip()
-            
-            # Filter: Month
-            s_df = sales_df[sales_df["month"] == selected_month].copy()
-            
-            # Filter: Category Match
-            s_df = s_df[s_df["category_clean"].isin(cup_categories)]
-            
-            # Filter: Order Type != Dine In
-            if "order type" in s_df.columns:
-                s_df["order type norm"] = s_df["order type"].astype(str).str.lower().str.strip()
-                # Exclude Dine In (Keep Delivery, Pick Up, Parcel, Takeaway etc.)
-                s_df = s_df[~s_df["order type norm"].str.contains("dine in", case=False, na=False)]
-            
-            # Calculate Total Sales Cups
-            # Finding quantity column
-            qty_col = next((c for c in s_df.columns if c in ["qty.", "qty", "quantity"]), None)
-            # Fallback
-            if not qty_col:
-                 qty_col = next((c for c in s_df.columns if "qty" in c or "quantity" in c), None)
-
-            if qty_col:
-                total_sales_cups = s_df[qty_col].sum()
-            else:
-                total_sales_cups = 0
-                st.error("Quantity column not found in sales data.")
-                
-            # ---------------------------------------------------------
-            # 2. INVENTORY SIDE (Actual Stock)
-            # ---------------------------------------------------------
-            # 2. INVENTORY SIDE (Actual Stock)
-            # ---------------------------------------------------------
-            # Filter master_df for items that represent Cups (Current Month)
-            current_month_cups = master_df[master_df["Item Name"].str.contains("CUP|LID", case=False, na=False)].copy()
-
-            # Global Cup List (from full history) to prevent filter reset when changing months
-            # We use 'df' which contains all months data
-            all_possible_cups = df[df["item name :"].str.contains("CUP|LID", case=False, na=False)]["item name :"].dropna().unique()
-            cup_item_names = sorted(all_possible_cups)
+            # Cup items from the full history, so the selection survives a month change
+            cup_item_names = filter_index.class_items(index, "cup", "lid")
             
             # User Request: Select specific cup items to include
             selected_cup_items = st.multiselect("Select Cup Inventory Items", cup_item_names, default=cup_item_names, key="cup_inventory_select")
+            cups = derived_cache.get("cup_totals", outlet=outlet, month=selected_month, cup_items=tuple(selected_cup_items or cup_item_names))
             
-            if selected_cup_items:
-                inventory_cups_df = current_month_cups[current_month_cups["Item Name"].isin(selected_cup_items)].copy()
-            else:
-                inventory_cups_df = current_month_cups.copy()
-            
-            total_opening = inventory_cups_df["Opening Stock"].sum()
-            total_supplied = inventory_cups_df["Supplied Qty"].sum()
-            total_closing = inventory_cups_df["Closing Stock"].sum()
+            total_sales_cups = cups["sales_cups"]
+            inventory_cups_df = cups["inventory"]
+            total_available = cups["available"]
+            missing_cups = cups["missing"]
             
             # ---------------------------------------------------------
-            # 3. RECONCILIATION
+            # 3. RECONCILIATION (Missing = Opening + Supplied - Consumed(Sales) - Actual Closing)
             # ---------------------------------------------------------
-            total_available = total_opening + total_supplied
-            # Logic: Opening + Supplied - Consumed(Sales) should be Closing
-            # So Variance = (Opening + Supplied - Consumed) - Actual Closing
-            # Or Missing = Expected Closing - Actual Closing
-            
-            expected_closing = total_available - total_sales_cups
-            missing_cups = expected_closing - total_closing
-            
             # Display Table
             st.write("### 📊 Reconciliation Summary")
+            rec_df = cups["summary"]
             
-            rec_data = {
-                "Metric": [
-                    "Opening Stock (Inventory)", 
-                    "Supplied (Warehouse)", 
-                    "Total Available", 
-                    "Consumed (Sales Calculation)", 
-                    "Expected Closing Stock", 
-                    "Actual Closing Stock (Inventory)", 
-                    "Missing / Variance"
-                ],
-                "Quantity": [
-                    total_opening, 
-                    total_supplied, 
-                    total_available, 
-                    total_sales_cups, 
-                    expected_closing, 
-                    total_closing, 
-                    missing_cups
-                ]
-            }
-            rec_df = pd.DataFrame(rec_data)
-            
-            # Formatting
-            st.dataframe(
-                rec_df.style.format({"Quantity": "{:,.0f}"})
-                .background_gradient(subset=["Quantity"], cmap="coolwarm", axis=0), 
-                use_container_width=True
-            )
+            # Formatting (colour scale as a bar column, rendered by the browser)
+            with profiling.span("render table", rows=len(rec_df)):
+                table_render.render(rec_df, "cup_reconciliation", formats={"Quantity": "%,.0f"}, scales={"Quantity": "auto-inverse"})
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -371,22 +514,35 @@ def main():
             
             with col_a:
                 st.write("#### 🧾 Sales Breakdown (Beverages)")
-                if qty_col:
-                    item_col = next((c for c in s_df.columns if "item" in c and "name" in c), "item name")
-                    sales_breakdown = s_df.groupby(item_col)[qty_col].sum().reset_index().sort_values(qty_col, ascending=False)
-                    sales_breakdown.columns = ["Beverage", "Qty Sold"]
-                    st.dataframe(sales_breakdown, use_container_width=True, height=300)
+                st.dataframe(cups["sales_breakdown"], use_container_width=True, height=300)
             
             with col_b:
                 st.write("#### 📦 Inventory Breakdown (Cups & Lids)")
                 inv_cols = ["Item Name", "Opening Stock", "Supplied Qty", "Closing Stock"]
                 st.dataframe(inventory_cups_df[inv_cols].sort_values("Closing Stock", ascending=False), use_container_width=True, height=300)
+
+            # ---------------------------------------------------------
+            # PER SIZE (recipes.csv maps each beverage to a cup and lid size)
+            # ---------------------------------------------------------
+            sku_report = derived_cache.get("cup_sku_report", outlet=outlet)
+            if sku_report is not None:
+                st.divider()
+                st.write("#### 📏 Cups & Lids by Size")
+                month_skus = sku_report[sku_report["month"] == selected_month]
+                sku_cols = ["sku", "Opening Stock", "Supplied Qty", "Closing Stock", "Consumption", "Expected (Sales)", "Variance"]
+                table_render.render(month_skus[sku_cols], "cup_sku_table", formats={c: "%,.0f" for c in sku_cols[1:]}, hide_index=True)
+
+                with st.expander("Variance by size, all months"):
+                    st.caption("Consumption - Expected (Sales). Positive = more used than the sales explain. "
+                               "Unsized = inventory names without a size, or sales with no size rule.")
+                    sku_matrix = reconciliation.sku_matrix(sku_report)
+                    st.dataframe(sku_matrix, column_config=table_render.column_config(sku_matrix, {c: "%,.0f" for c in sku_matrix.columns}), use_container_width=True)
         
     elif page == "Coffee Consumption":
         st.subheader(f"☕ Coffee Consumption for {selected_month_str}")
         
         # Filter for Coffee
-        coffee_df = master_df[master_df["Category"].str.contains("TEAS & COFFEES", case=False, na=False)].copy()
+        coffee_df = master_df[master_df["Item Name"].isin(index["classes"]["coffee"])].copy()
         
         if coffee_df.empty:
             st.info("No Coffee items found for this month.")
@@ -395,9 +551,15 @@ def main():
             total_consumption = coffee_df["Consumption"].sum()
             avg_consumption = coffee_df["Consumption"].mean()
             
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             col1.metric("Total Consumption (Units/Kg)", f"{total_consumption:,.2f}")
             col2.metric("Avg Consumption per Item", f"{avg_consumption:,.2f}")
+
+            # Recipe based expectation (17 g per cup rule from recipes.csv)
+            sales_agg = derived_cache.get("month_rollup", outlet=outlet, month=selected_month)
+            if sales_agg is not None:
+                expected_coffee = recipes.expected_consumption(load_recipe_book(), sales_agg, kind="coffee")
+                col3.metric("Expected from Sales (Kg)", f"{expected_coffee['expected_qty'].sum() / 1000.0:,.2f}")
             
             # Chart
             st.write("### Consumption by Item")
@@ -407,113 +569,23 @@ def main():
             # Detailed Table
             st.write("### Detailed Breakdown")
             cols = ["Item Name", "Opening Stock", "Supplied Qty", "Total Available", "Closing Stock", "Consumption", "UOM"]
-            st.dataframe(coffee_df[cols].style.background_gradient(subset=["Consumption"], cmap="Reds"), use_container_width=True)
+            with profiling.span("render table", rows=len(coffee_df)):
+                table_render.render(coffee_df[cols], "coffee_table", formats={c: "%,.2f" for c in cols[1:6]}, scales={"Consumption": "red"})
 
     elif page == "Syrup Consumption":
         st.subheader(f"🍯 Syrup Reconciliation for {selected_month_str}")
         
-        # ---------------------------------------------------------
-        # 0. RECIPE DATA
-        # ---------------------------------------------------------
-        syrup_recipe_data = [
-            {"item_name": "Lemon Cheesecake Fizz", "syrup_name": "Cheese Cake Syrup", "ml_per_cup": 22.5},
-            {"item_name": "Lemon Cheesecake Fizz", "syrup_name": "Vanilla Syrup", "ml_per_cup": 5},
-            {"item_name": "Madhurai Mule", "syrup_name": "Ginger Syrup", "ml_per_cup": 15},
-            {"item_name": "Butterpop", "syrup_name": "Brown Butter", "ml_per_cup": 10},
-            {"item_name": "Butterpop", "syrup_name": "Caramel", "ml_per_cup": 15},
-            {"item_name": "Butterpop", "syrup_name": "Vanilla", "ml_per_cup": 12},
-            {"item_name": "Pina Colada Cold Brew Tonic", "syrup_name": "Pina Colada Syrup", "ml_per_cup": 25},
-            {"item_name": "Peaches and Cream Latte (Iced)", "syrup_name": "Peach Syrup", "ml_per_cup": 22.5},
-            {"item_name": "Almond Croissant Latte", "syrup_name": "Amaretto Syrup", "ml_per_cup": 20},
-            {"item_name": "Almond Croissant Latte", "syrup_name": "Brown Bread Syrup", "ml_per_cup": 5},
-            {"item_name": "Almond Croissant Latte", "syrup_name": "Vanilla Syrup", "ml_per_cup": 5},
-            {"item_name": "Banana Bread Latte", "syrup_name": "Banana Beverage Blend Syrup", "ml_per_cup": 20},
-            {"item_name": "Banana Bread Latte", "syrup_name": "Vanilla Syrup", "ml_per_cup": 4},
-            {"item_name": "Banana Bread Latte", "syrup_name": "Liquid Jaggery", "ml_per_cup": 5},
-            {"item_name": "Christmas in the cup", "syrup_name": "Vanilla Syrup", "ml_per_cup": 15},
-            {"item_name": "Raspberry Matcha", "syrup_name": "Raspberry Syrup", "ml_per_cup": 20},
-            {"item_name": "Salted Honey Matcha", "syrup_name": "Honey Syrup", "ml_per_cup": 20},
-            {"item_name": "Miso Salted Caramel", "syrup_name": "Caramel Syrup", "ml_per_cup": 21.5}
-]
-        syrup_recipe = pd.DataFrame(syrup_recipe_data)
-        syrup_recipe["item_name_clean"] = syrup_recipe["item_name"].astype(str).str.lower().str.strip()
-
-        # ---------------------------------------------------------
-        # 1. CALCULATE CONSUMPTION (From Sales)
-        # ---------------------------------------------------------
-        sales_consumption = None
-        if sales_df_raw is not None:
-            sales_df = preprocess_sales(sales_df_raw)
-            s_df = sales_df[sales_df["month"] == selected_month].copy()
-            
-            item_col_sales = next((c for c in s_df.columns if "item" in c and "name" in c), None)
-            if item_col_sales:
-                s_df["item_name_clean"] = s_df[item_col_sales].astype(str).str.lower().str.strip()
-                merged_df = s_df.merge(syrup_recipe, on="item_name_clean", how="inner")
-                
-                qty_col = next((c for c in s_df.columns if c in ["qty.", "qty", "quantity"]), "qty")
-                if qty_col in merged_df.columns:
-                    merged_df["total_ml"] = merged_df[qty_col] * merged_df["ml_per_cup"]
-                    sales_consumption = merged_df.groupby("syrup_name")["total_ml"].sum().reset_index()
-                    sales_consumption["Sales Consumption (L)"] = sales_consumption["total_ml"] / 1000.0
-
-        # ---------------------------------------------------------
-        # 2. INVENTORY PREP
-        # ---------------------------------------------------------
-        syrup_inv = master_df[master_df["Category"].astype(str).str.contains("SYRUP", case=False, na=False)].copy()
+        # Syrup stock in litres and the recipe consumption from the month's sales
+        # (derived tables syrup_inventory / syrup_reconciliation)
+        sales_agg = derived_cache.get("month_rollup", outlet=outlet, month=selected_month)
+        profiling.memory_snapshot("month sales rollup", sales_agg)
+        syrup_inv = derived_cache.get("syrup_inventory", outlet=outlet, month=selected_month)
         
         if syrup_inv.empty:
             st.info("No Syrups in Inventory.")
         else:
-            # Bottle Size
-            def get_bottle_size_ml(item_name):
-                name = str(item_name).upper()
-                if "1 LTR" in name or "1LTR" in name: return 1000.0
-                if "700" in name: return 700.0
-                if "250" in name: return 250.0
-                return 700.0
-            
-            syrup_inv["Bottle Size (ml)"] = syrup_inv["Item Name"].apply(get_bottle_size_ml)
-            
-            # --- Convert Everything to Liters ---
-            syrup_inv["Opening Stock (L)"] = (syrup_inv["Opening Stock"] * syrup_inv["Bottle Size (ml)"]) / 1000.0
-            syrup_inv["Supplied Qty (L)"] = (syrup_inv["Supplied Qty"] * syrup_inv["Bottle Size (ml)"]) / 1000.0
-            syrup_inv["Total Available (L)"] = syrup_inv["Opening Stock (L)"] + syrup_inv["Supplied Qty (L)"]
-            
-            # Fuzzy Map
-            def clean_name_for_map(name):
-                import re
-                name = str(name).upper()
-                name = re.sub(r"\(.*?\)", "", name)
-                for word in ["MONIN", "SYRUP", "1", "LTR", "ML", " "]:
-                    name = name.replace(word, "")
-                return name.strip()
-
-            syrup_inv["join_key"] = syrup_inv["Item Name"].apply(clean_name_for_map)
-            
-            if sales_consumption is not None:
-                sales_consumption["join_key"] = sales_consumption["syrup_name"].apply(clean_name_for_map)
-                
-                # Merge Sales Consumption into Inventory
-                merged = syrup_inv.merge(sales_consumption[["join_key", "Sales Consumption (L)"]], on="join_key", how="left")
-                merged["Sales Consumption (L)"] = merged["Sales Consumption (L)"].fillna(0)
-                
-                # ---------------------------------------------------------
-                # 3. FINAL LOGIC: DEDUCT RECIPE CONSUMPTION
-                # ---------------------------------------------------------
-                # Closing Stock = Total Available - Consumption
-                merged["Closing Stock (L)"] = merged["Total Available (L)"] - merged["Sales Consumption (L)"]
-                
-                # Rename for Display to match request
-                # Request: syrup name , supplied qty , total available , closing stock , consumption
-                final_df = merged.rename(columns={
-                    "Item Name": "Syrup Name",
-                    "Supplied Qty (L)": "Supplied Qty (L)",
-                    "Total Available (L)": "Total Available (L)",
-                    "Sales Consumption (L)": "Consumption (L)",
-                    "Closing Stock (L)": "Closing Stock (L)"
-                })
-                
+            final_df = derived_cache.get("syrup_reconciliation", outlet=outlet, month=selected_month)
+            if final_df is not None:
                 st.caption("Values are in **Liters**. 'Closing Stock' is the calculated remaining stock after deducting recipe-based consumption.")
                 
                 disp_cols = [
@@ -524,16 +596,156 @@ def main():
                     "Closing Stock (L)"
                 ]
                 
-                st.dataframe(
-                    final_df[disp_cols].sort_values("Consumption (L)", ascending=False)
-                    .style.format("{:.2f}")
-                    .background_gradient(subset=["Closing Stock (L)"], cmap="Blues"),
-                    use_container_width=True
-                )
+                with profiling.span("render table", rows=len(final_df)):
+                    table_render.render(
+                        final_df[disp_cols].sort_values("Consumption (L)", ascending=False), "syrup_table",
+                        formats={c: "%.2f" for c in disp_cols[1:]}, scales={"Closing Stock (L)": "blue"},
+                    )
+
+                recipe_book = load_recipe_book()
+                recipe_syrups = recipe_book["ingredients"].index[recipe_book["ingredients"]["kind"] == "syrup"]
+                to_review = syrup_matching.review(load_syrup_matches(tuple(recipe_syrups), tuple(index["classes"]["syrup"]), syrup_matching.mappings_version()))
+                if not to_review.empty:
+                    with st.expander(f"⚠️ {len(to_review)} recipe syrup(s) not matched to inventory"):
+                        st.caption("Their consumption is not deducted. Confirm a mapping in `syrup_mappings.json` (`python syrup_matching.py --accept`).")
+                        st.dataframe(to_review, hide_index=True)
                 
             else:
                 st.warning("Sales data missing/mismatch.")
                 st.dataframe(syrup_inv)
 
+    elif page == "Daily Ledger":
+        st.subheader("📒 Daily Stock Ledger")
+        st.caption("Stock takes reset the balance; warehouse issues add to it and recipe-based syrup deductions take away, day by day.")
+
+        stock_ledger = derived_cache.get("daily_ledger", outlet=outlet)
+        date_range = st.date_input(
+            "Date Range",
+            (selected_month.start_time.date(), selected_month.end_time.date()),
+            key="ledger_range",
+        )
+
+        if stock_ledger is None or stock_ledger.empty:
+            st.info("No ledger events.")
+        elif len(date_range) != 2:
+            st.info("Pick a start and an end date.")
+        else:
+            start, end = date_range
+            range_df = ledger.reconcile_range(stock_ledger, start, end)
+
+            item_map = df[["item code :", "item name :", "category :", "uom :"]].astype(str).drop_duplicates("item code :")
+            item_map.columns = ["Item Code", "Item Name", "Category", "UOM"]
+            range_df = item_map.merge(range_df, on="Item Code", how="inner")
+
+            # Filtering
+            if selected_categories:
+                range_df = range_df[range_df["Category"].isin(selected_categories)]
+            if selected_items:
+                range_df = range_df[range_df["Item Name"].isin(selected_items)]
+
+            st.write(f"### Reconciliation {start} → {end}")
+            st.caption("Opening + Issued − Sales Deductions + Count Adjustments = Closing. 'Month-End Issues' were issued on the last two days of a month (cut-off risk).")
+            ledger_state = (derived_cache.key("daily_ledger", {"outlet": outlet}), start, end, tuple(selected_categories), tuple(selected_items))
+            table_render.render(range_df, "ledger_table", state=ledger_state, hide_index=True)
+
+            if selected_items:
+                st.write("### Daily Balance")
+                codes = range_df.set_index("Item Code")["Item Name"]
+                balances = ledger.daily_balances(stock_ledger, start, end).reindex(codes.index)
+                st.line_chart(balances.rename(index=codes).T)
+            else:
+                st.caption("Select items in the sidebar to chart their daily balance.")
+
+            risky = stock_ledger[
+                stock_ledger["month_end_risk"]
+                & stock_ledger["date"].between(pd.Timestamp(start), pd.Timestamp(end))
+                & stock_ledger["item code"].isin(range_df["Item Code"])
+            ]
+            if not risky.empty:
+                with st.expander(f"⚠ Month-End Dispatch Risk ({len(risky)} issues)"):
+                    risky = risky.merge(item_map, left_on="item code", right_on="Item Code")
+                    st.dataframe(risky[["date", "Item Name", "Category", "qty"]].rename(columns={"date": "Issue Date", "qty": "Issue Qty"}), hide_index=True)
+
+    elif page == "Top Leaks":
+        st.subheader("🚨 Top Leaks")
+        st.caption(
+            f"Each item's monthly Consumption and Variance (Consumption − recipe expectation, syrups and cup / lid sizes) "
+            f"against its own previous {anomalies.WINDOW} months: robust z = (value − median) / (1.4826 × MAD). "
+            f"Items need {anomalies.MIN_HISTORY} months of history to be scored."
+        )
+
+        scored = derived_cache.get("anomaly_scores", outlet=outlet)
+        col1, col2 = st.columns(2)
+        threshold = col1.number_input("Flag at z ≥", min_value=0.0, value=anomalies.THRESHOLD, step=0.5, key="leak_threshold")
+        this_month_only = col2.checkbox(f"Only {selected_month_str}", key="leak_month_only")
+
+        leaks = anomalies.top_leaks(scored, threshold, months=[selected_month] if this_month_only else None)
+        # Filtering
+        if selected_categories:
+            leaks = leaks[leaks["Category"].isin(selected_categories) | (leaks["Category"] == "CUPS & LIDS (BY SIZE)")]
+        if selected_items:
+            leaks = leaks[leaks["Item Name"].isin(selected_items)]
+
+        if leaks.empty:
+            st.info("No item month scores above the threshold.")
+        else:
+            leaks = leaks.assign(month=leaks["month"].astype(str))
+            leak_state = (derived_cache.key("anomaly_scores", {"outlet": outlet}), threshold, this_month_only and selected_month_str,
+                          tuple(selected_categories), tuple(selected_items))
+            table_render.render(leaks, "leak_table", state=leak_state, formats={c: "%,.2f" for c in anomalies.LEAK_COLUMNS[5:]}, hide_index=True)
+
+            # History of one flagged item against its rolling baseline
+            codes = leaks.drop_duplicates("Item Code").set_index("Item Code")["Item Name"]
+            code = st.selectbox("Item History", codes.index, format_func=lambda c: f"{codes[c]} ({c})", key="leak_item")
+            measure = st.radio("Measure", anomalies.MEASURES, horizontal=True, key="leak_measure")
+            item = scored[scored["Item Code"] == code].assign(month=lambda d: d["month"].astype(str)).set_index("month")
+            st.line_chart(item[[measure, f"{measure} Baseline"]])
+
+    profiling.end(page_span)
+
+    # Bulk export of the per-month tables (export.py): one month built and written at a time
+    with st.sidebar.expander("📦 Export"):
+        export_months = st.multiselect("Months", available_months, default=available_months, key="export_months")
+        export_formats = st.multiselect("Formats", export.FORMATS, default=["parquet"], key="export_formats")
+        if st.button("Export", key="export_run", disabled=not export_months or not export_formats):
+            folder = os.path.join(export.OUT_DIR, f"{outlet}-{datetime.now():%Y%m%d-%H%M%S}")
+            bar = st.progress(0.0)
+            try:
+                with profiling.span("export", months=len(export_months), formats=",".join(export_formats)):
+                    written = export.export(
+                        export_months, lambda month: export_tables(outlet, index, month), folder, export_formats,
+                        progress=lambda done, total, month: bar.progress(done / total, text=f"{month} written"),
+                    )
+                    st.session_state["export_zip"] = export.zip_folder(folder)
+                st.success(f"{len(written)} file(s) / dataset(s) in `{folder}`")
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+        zip_path = st.session_state.get("export_zip")
+        if zip_path and os.path.exists(zip_path):
+            with open(zip_path, "rb") as f:
+                st.download_button("Download (zip)", f, file_name=os.path.basename(zip_path), mime="application/zip", key="export_download")
+
+    with st.sidebar.expander("Load timings"):
+        st.dataframe(load_report, hide_index=True)
+
+    # Resident size of the loaded frames after schema compaction (per source)
+    with st.sidebar.expander("Memory footprint"):
+        st.dataframe(schema.memory_report().style.format({"Parsed (MB)": "{:.2f}", "After (MB)": "{:.2f}", "Saved %": "{:.0f}%"}), hide_index=True)
+
+    if debug:
+        with st.sidebar.expander("🐞 Debug timings", expanded=True):
+            st.caption("This run, by span name (cache hits show up as short loader calls with nothing inside)")
+            st.dataframe(profiling.summary_frame(trace).style.format({"Total (ms)": "{:,.1f}", "Max (ms)": "{:,.1f}"}), hide_index=True)
+            st.caption("Every span, nested")
+            st.dataframe(profiling.spans_frame(trace).style.format({"Start (ms)": "{:,.1f}", "Duration (ms)": "{:,.1f}"}), hide_index=True)
+            st.caption("Cached frames")
+            st.dataframe(profiling.memory_frame(trace).style.format({"Memory (MB)": "{:,.2f}"}), hide_index=True)
+            st.caption("Derived tables since the app started (builds = cache misses)")
+            st.dataframe(derived_cache.stats_frame().style.format({"Build (ms)": "{:,.1f}"}), hide_index=True)
+            slices = table_render.cache_info()
+            st.caption(f"Table page slices: {slices['slices']} cached, {slices['hits']} hits, {slices['misses']} misses")
+            st.download_button("Download trace (JSON)", profiling.to_chrome_trace(trace), file_name=f"trace-{page}.json".replace(" ", "-").lower(),
+                               mime="application/json", help="Chrome trace-event format: chrome://tracing or ui.perfetto.dev")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
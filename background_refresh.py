@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+
+import outlets
+import parallel_loader
+import sales_store
+import snapshot_cache
+
+# Background refresh of the source sheets, so no page render waits for a download.
+#
+# A daemon thread runs parallel_loader.refresh_all every INTERVAL_SECONDS: a conditional
+# download of every sheet, a parse of only what changed, the incremental sales ingest.
+# Every snapshot is written to a temp file and swapped in with os.replace, so a render
+# reads either the previous or the new snapshot of a sheet, never a partial one. While the
+# refresher runs the app reads with READ_TTL: the last completed snapshot is the current one.
+#
+# After each cycle the result (times, load report) is published in one assignment; the
+# app shows it in the sidebar with a "data as of" stamp.
+
+# BACKGROUND_REFRESH=0: no thread, the app refreshes stale sheets inline (prefetch_sources)
+ENABLED = os.environ.get("BACKGROUND_REFRESH", "1") != "0"
+INTERVAL_SECONDS = int(os.environ.get("BACKGROUND_REFRESH_SECONDS", 15 * 60))
+
+READ_TTL = float("inf")
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_first_cycle = threading.Event()
+_thread = None
+_force = False
+_running = False
+_latest = None
+
+
+def start(interval=None):
+    # One refresher per process; Streamlit reruns call this on every run
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, args=(interval or INTERVAL_SECONDS,), name="background-refresh", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def refresh_now(force=True):
+    # Start a cycle now instead of at the next interval (force: ignore the snapshot TTL)
+    global _force
+    with _lock:
+        _force = _force or force
+    _wake.set()
+
+
+def _run(interval):
+    global _force, _running, _latest
+    while True:
+        with _lock:
+            force, _force = _force, False
+            _wake.clear()
+        _running = True
+        started = time.time()
+        # Sheets last checked at least one interval ago are checked again. Parsing runs in
+        # threads, like app.prefetch_sources: off the render path its speed matters less
+        try:
+            report, error = parallel_loader.refresh_all(force_refresh=force, ttl=interval, use_processes=False), None
+        except Exception as e:
+            # Kept in latest()["error"]; the app shows it in the sidebar
+            report, error = None, str(e)
+        _latest = {"started_at": started, "completed_at": time.time(), "report": report, "error": error}
+        _running = False
+        _first_cycle.set()
+        _wake.wait(interval)
+
+
+def latest():
+    # Last completed cycle: {"started_at", "completed_at", "report", "error"}, None before the first
+    return _latest
+
+
+def is_refreshing():
+    return _running
+
+
+def wait_for_first_cycle(timeout=None):
+    return _first_cycle.wait(timeout)
+
+
+def read_ttl():
+    # Snapshot TTL for readers: never stale while the refresher keeps them current
+    return READ_TTL if ENABLED else None
+
+
+def data_as_of(outlet):
+    # Oldest time one of the outlet's sheets was last confirmed current (None: no data yet)
+    times = []
+    for kind in outlets.KINDS:
+        source = outlets.source_for(outlet, kind)
+        if kind == "sales" and sales_store.INGEST_MODE == "incremental":
+            meta = sales_store.read_state(source)
+        else:
+            meta = snapshot_cache.read_meta(source)
+        if meta is not None:
+            times.append(meta["fetched_at"])
+    return min(times) if times else None
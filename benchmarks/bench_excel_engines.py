@@ -0,0 +1,48 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_reader
+import schema
+
+# Compare XLSX engines (full read vs column projection) on the bundled workbooks.
+#   python benchmarks/bench_excel_engines.py --repeat 5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKBOOKS = {
+    "stock": os.path.join(ROOT, "Stock Take.xlsx"),
+    "warehouse": os.path.join(ROOT, "Issue Details ( AUG - DEC ).xlsx"),
+}
+
+
+def time_read(path, engine, columns, repeat):
+    with open(path, "rb") as f:
+        payload = f.read()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = excel_reader.read_excel(payload, 0, columns=columns, engine=engine)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), df.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark XLSX reader engines")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'workbook':<10} {'engine':<16} {'columns':<10} {'median s':>9} {'shape':>12}")
+    for source, path in WORKBOOKS.items():
+        for engine in excel_reader.available_engines():
+            for label, columns in [("all", None), ("projected", schema.wants_column(source))]:
+                seconds, shape = time_read(path, engine, columns, args.repeat)
+                print(f"{source:<10} {engine:<16} {label:<10} {seconds:>9.3f} {str(shape):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anomalies
+import pipeline
+import recipes
+import reconciliation
+import sales_rollup
+import synthetic
+
+# Time every pipeline stage on synthetic sheets at 10x / 100x / 1000x today's volume.
+#   python benchmarks/bench_pipeline.py                  scales 10 and 100
+#   python benchmarks/bench_pipeline.py --scales 1000    (several GB of memory for the sales sheet)
+# Every run is appended to benchmarks/history.csv (commit, scale, stage, rows, seconds) and
+# compared with the previous run of the same stage and scale. Timings are per machine, so the
+# file stays local (.gitignore).
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.csv")
+HISTORY_FIELDS = ["run_at", "commit", "scale", "stage", "rows", "seconds"]
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=synthetic.ROOT, timeout=10)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def timed(fn, repeat, fresh=None):
+    # Median of `repeat` runs; `fresh` builds the input each time (preprocess_* modify their input)
+    timings = []
+    for _ in range(repeat):
+        args = fresh() if fresh else ()
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def run_scale(scale, repeat):
+    # (stage, input rows, seconds) for one scale, in pipeline order
+    results = []
+    start = time.perf_counter()
+    raw = synthetic.generate(scale)
+    results.append(("generate", sum(len(df) for df in raw.values()), time.perf_counter() - start))
+
+    def stage(name, rows, fn, fresh=None):
+        result, seconds = timed(fn, repeat, fresh)
+        results.append((name, rows, seconds))
+        return result
+
+    stock = stage("preprocess_data", len(raw["stock"]), pipeline.preprocess_data, lambda: (raw["stock"].copy(),))
+    stock_summary = stage("get_stock_summary", len(stock), lambda: pipeline.get_stock_summary(stock))
+    warehouse = stage("preprocess_warehouse", len(raw["warehouse"]), pipeline.preprocess_warehouse, lambda: (raw["warehouse"].copy(),))
+    warehouse_summary = stage("get_warehouse_summary", len(warehouse), lambda: pipeline.get_warehouse_summary(warehouse))
+    sales = stage("preprocess_sales", len(raw["sales"]), pipeline.preprocess_sales, lambda: (raw["sales"].copy(),))
+
+    # master_df: the cube, then one month slice per month (what a sidebar change costs)
+    cube = stage("build_cube", len(stock_summary), lambda: reconciliation.build_cube(stock, stock_summary, warehouse_summary))
+    months = cube.index.get_level_values("month").unique()
+    stage("month_slice (all months)", len(cube), lambda: [reconciliation.month_slice(cube, m) for m in months])
+
+    compiled = recipes.compile_registry(recipes.load_registry())
+    rollup = stage("rollup_sales", len(sales), lambda: sales_rollup.rollup_sales(sales))
+    expected = stage("expected_consumption", len(rollup), lambda: recipes.expected_consumption(compiled, rollup, by="month"))
+
+    def of_kind(*kinds):
+        return expected[expected["kind"].isin(kinds)]
+
+    stage("coffee page", len(cube), lambda: reconciliation.coffee_by_month(cube, of_kind("coffee")))
+    syrup = stage("syrup page", len(cube), lambda: reconciliation.syrup_by_month(cube, of_kind("syrup")))
+    stage("cup page", len(cube), lambda: reconciliation.cups_by_month(cube, stock, of_kind("cup")))
+    cup_skus = stage("cup sizes", len(cube), lambda: reconciliation.cup_skus_by_month(cube, stock, of_kind("cup", "lid")))
+    stage("anomalies", len(cube), lambda: anomalies.score(anomalies.item_history(cube, stock["month"].unique(), syrup, cup_skus)))
+    return results
+
+
+def load_history(path):
+    try:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    except OSError:
+        return []
+
+
+def append_history(path, rows):
+    new_file = not os.path.exists(path)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the reconciliation pipeline on synthetic data")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100], help="multiples of today's volume")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--history", default=HISTORY_PATH, help="CSV the results are appended to")
+    parser.add_argument("--no-history", action="store_true", help="print only, do not record the run")
+    args = parser.parse_args()
+
+    previous = {}
+    for row in load_history(args.history):
+        previous[(int(row["scale"]), row["stage"])] = float(row["seconds"])
+
+    run_at = datetime.now().isoformat(timespec="seconds")
+    commit = git_commit()
+    recorded = []
+    per_row = {}
+    print(f"{'scale':>6} {'stage':<26} {'rows':>11} {'seconds':>9} {'us/row':>8} {'vs last':>8}")
+    for scale in args.scales:
+        for stage, rows, seconds in run_scale(scale, args.repeat):
+            last = previous.get((scale, stage))
+            change = f"{seconds / last:.2f}x" if last else ""
+            per_row.setdefault(stage, {})[scale] = seconds / max(rows, 1)
+            print(f"{scale:>6} {stage:<26} {rows:>11,} {seconds:>9.3f} {1e6 * seconds / max(rows, 1):>8.2f} {change:>8}")
+            recorded.append({"run_at": run_at, "commit": commit, "scale": scale, "stage": stage,
+                             "rows": rows, "seconds": f"{seconds:.6f}"})
+
+    # Cost per row growing with the scale = the stage stops scaling linearly
+    if len(args.scales) > 1:
+        low, high = min(args.scales), max(args.scales)
+        print(f"\nPer-row cost at {high}x relative to {low}x (1.00 = linear):")
+        for stage, costs in per_row.items():
+            if costs.get(low):
+                print(f"  {stage:<26} {costs[high] / costs[low]:>6.2f}")
+
+    if not args.no_history:
+        append_history(args.history, recorded)
+        print(f"\nAppended {len(recorded)} timings to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_sources
+import snapshot_cache
+
+# Cold load (fetch + parse, no snapshot) of the bundled workbooks from every local backend:
+# xlsx from disk, the same files over the local HTTP stand-in, and Parquet copies.
+# "check s" is what an unchanged source costs once its snapshot is stale (conditional fetch).
+#   python benchmarks/bench_sources.py --repeat 5
+# No network is involved, so the numbers are reproducible from run to run.
+
+SOURCES = ["stock", "warehouse"]
+
+
+def time_load(source, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload, validators = snapshot_cache.fetch_payload(source)
+        fetched = time.perf_counter() - start
+        df = snapshot_cache.parse_payload(source, payload)
+        loaded = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot_cache.fetch_payload(source, validators)
+        timings.append((fetched, loaded, time.perf_counter() - start))
+    fetched, loaded, checked = (statistics.median(t[i] for t in timings) for i in range(3))
+    return fetched, loaded, checked, len(payload), df.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local data source backends")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = data_sources.CONFIG
+    server = data_sources.make_server(0, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as parquet_dir:
+        # Parquet copies parsed from the bundled workbooks
+        config.update(default="xlsx", sources={})
+        for source in SOURCES:
+            df = snapshot_cache.parse_payload(source, snapshot_cache.fetch_payload(source)[0])
+            df.to_parquet(os.path.join(parquet_dir, f"{source}.parquet"), index=False)
+
+        runs = {
+            "xlsx": {},
+            "http": {"http_url": f"http://127.0.0.1:{server.server_address[1]}"},
+            "parquet": {"parquet_dir": parquet_dir},
+        }
+        print(f"{'source':<10} {'backend':<8} {'fetch s':>8} {'total s':>8} {'check s':>8} {'MB':>7} {'shape':>12}")
+        for backend, settings in runs.items():
+            config.update(default=backend, **settings)
+            for source in SOURCES:
+                fetched, total, checked, size, shape = time_load(source, args.repeat)
+                print(f"{source:<10} {backend:<8} {fetched:>8.3f} {total:>8.3f} {checked:>8.4f} {size / 1e6:>7.2f} {str(shape):>12}")
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
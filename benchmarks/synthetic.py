@@ -0,0 +1,184 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recipes
+
+# Synthetic Stock Take / Issue Details / PetPooja sheets at a multiple of today's volume.
+#
+# Frames come out exactly as snapshot_cache.load_source returns the real sheets (same raw
+# headers, before lower().strip()), so they go through pipeline.preprocess_* unchanged.
+# Stock items are the bundled Stock Take item master repeated `scale` times under new codes;
+# sales are drawn from the recipes.csv menu so the recipe matrices do real work.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STOCK_WORKBOOK = os.path.join(ROOT, "Stock Take.xlsx")
+
+# Rows at scale 1: the bundled workbooks, and roughly one AUG - DEC PetPooja export
+BASE_ROWS = {"stock": 777, "warehouse": 1082, "sales": 25000}
+
+COUNT_MONTHS = pd.period_range("2025-07", "2025-11", freq="M")
+ISSUE_DAYS = pd.date_range("2025-08-01", "2025-12-17", freq="D")
+COST_CENTER = "FRONT OF HOUSE  (MULLA HOUSE)"
+ORDER_TYPES = ["Dine In", "Delivery", "Pick Up"]
+
+STOCK_COLUMNS = [
+    "Inventory Date :", "Cost Center :", "Sub Cost Center", "Item Code :", "Item Name :", "Purchase Rate :",
+    "Category :", "Cost Category :", "Super Category", "Full Qty", "UOM :", "Open Qty", "Open UOM :",
+    "Line Value :", "Physical Quantity :", "Physical Value", "Status :", "Remark", "Added User", "Added Time",
+    "Added User.1", "Added Time.1", "Modified User", "Modified Time", "S.No", "Expected Closing",
+]
+
+WAREHOUSE_COLUMNS = [
+    "Issue Date :", "Requesting Cost Center :", "Issuing Cost Center :", "Issue Number :", "Issue Status",
+    "Item Issue Status :", "Item Code", "Item Name :", "Category :", "UOM :", "Requisition Quantity :",
+    "Issue Quantity :", "Pending Issue Quantity", "Received Quantity :", "Receiving Difference", "Item Rate :",
+    "Line Item Total :", "Item Remarks", "Issue Remark :", "Added Time", "Added User", "MF Issuing Cost Center (A)",
+]
+
+SALES_COLUMNS = [
+    "Date", "Timestamp", "Invoice No.", "Payment Type", "Order Type", "Item Name", "Price", "Qty.",
+    "Category", "Group Name", "Status",
+]
+
+
+def catalogue(scale):
+    # Item master (code, name, category, UOM, rate) repeated `scale` times; copy k > 0 gets
+    # "-k" / " #k" suffixes so every copy is a distinct item with the same classification
+    master = pd.read_excel(STOCK_WORKBOOK, usecols=["Item Code :", "Item Name :", "Category :", "UOM :", "Purchase Rate :"])
+    master = master.dropna(subset=["Item Code :"]).drop_duplicates("Item Code :").reset_index(drop=True)
+    copies = np.repeat(np.arange(scale), len(master))
+    items = pd.concat([master] * scale, ignore_index=True)
+    suffix = np.where(copies > 0, "-" + copies.astype(str), "")
+    items["Item Code :"] = items["Item Code :"].astype(str) + suffix
+    items["Item Name :"] = items["Item Name :"].astype(str) + np.where(copies > 0, " #" + copies.astype(str), "")
+    return items
+
+
+def menu():
+    # (item name, PetPooja category) pairs: every recipes.csv item and category rule,
+    # plus one non-beverage line per category that no recipe applies to
+    registry = recipes.load_registry()
+    named = registry.loc[registry["match"] == "item", "key"].drop_duplicates()
+    categories = registry.loc[registry["match"] == "category", "key"].drop_duplicates()
+    rows = [(name, "Beverages [O]") for name in named]
+    rows += [(f"House {c.title()}", c.title()) for c in categories]
+    rows += [("Croissant", "Bakery"), ("Banana Bread", "Bakery"), ("Avocado Toast", "All Day Breakfast")]
+    return pd.DataFrame(rows, columns=["Item Name", "Category"])
+
+
+def stock_take(scale, seed=0, items=None):
+    rng = np.random.default_rng(seed)
+    items = catalogue(scale) if items is None else items
+    n = BASE_ROWS["stock"] * scale
+    pick = rng.integers(0, len(items), n)
+    # Counts on the last day of each month, like the real sheet
+    count_dates = COUNT_MONTHS.to_timestamp(how="end").normalize()
+    dates = count_dates[rng.integers(0, len(count_dates), n)]
+    rows = items.iloc[pick].reset_index(drop=True)
+    qty = np.round(rng.gamma(2.0, 10.0, n), 2)
+    rate = rows["Purchase Rate :"].fillna(0).to_numpy()
+
+    df = pd.DataFrame({
+        "Inventory Date :": dates,
+        "Cost Center :": COST_CENTER,
+        "Sub Cost Center": np.nan,
+        "Item Code :": rows["Item Code :"],
+        "Item Name :": rows["Item Name :"],
+        "Purchase Rate :": rate,
+        "Category :": rows["Category :"],
+        "Cost Category :": "FOOD",
+        "Super Category": "PROVISIONS",
+        "Full Qty": 0,
+        "UOM :": rows["UOM :"],
+        "Open Qty": 0.0,
+        "Open UOM :": rows["UOM :"],
+        "Line Value :": np.round(qty * rate, 2),
+        "Physical Quantity :": qty,
+        "Physical Value": np.arange(n),
+        "Status :": "Completed",
+        "Remark": np.nan,
+        "Added User": "barista",
+        "Added Time": dates,
+        "Added User.1": "barista",
+        "Added Time.1": dates,
+        "Modified User": "barista",
+        "Modified Time": dates,
+        "S.No": np.arange(1, n + 1),
+        "Expected Closing": np.nan,
+    })
+    return df[STOCK_COLUMNS]
+
+
+def issues(scale, seed=1, items=None):
+    rng = np.random.default_rng(seed)
+    items = catalogue(scale) if items is None else items
+    n = BASE_ROWS["warehouse"] * scale
+    rows = items.iloc[rng.integers(0, len(items), n)].reset_index(drop=True)
+    dates = ISSUE_DAYS[np.sort(rng.integers(0, len(ISSUE_DAYS), n))]
+    requested = rng.integers(1, 50, n).astype(float)
+    issued = np.minimum(requested, rng.integers(0, 50, n)).astype(float)
+    rate = rows["Purchase Rate :"].fillna(0).to_numpy()
+
+    df = pd.DataFrame({
+        "Issue Date :": dates,
+        "Requesting Cost Center :": COST_CENTER,
+        "Issuing Cost Center :": "NANDAN WAREHOUSE",
+        "Issue Number :": "NAD-ISS-" + (np.arange(n) // 5).astype(str),
+        "Issue Status": rng.choice(["Issued", "Received", "Partial Received"], n),
+        "Item Issue Status :": np.where(issued < requested, "Pending", "Issued"),
+        "Item Code": rows["Item Code :"],
+        "Item Name :": rows["Item Name :"],
+        "Category :": rows["Category :"],
+        "UOM :": rows["UOM :"],
+        "Requisition Quantity :": requested,
+        "Issue Quantity :": issued,
+        "Pending Issue Quantity": requested - issued,
+        "Received Quantity :": 0.0,
+        "Receiving Difference": issued,
+        "Item Rate :": rate,
+        "Line Item Total :": np.round(issued * rate, 2),
+        "Item Remarks": np.nan,
+        "Issue Remark :": np.nan,
+        "Added Time": dates,
+        "Added User": "warehouse",
+        "MF Issuing Cost Center (A)": "NANDAN WAREHOUSE",
+    })
+    return df[WAREHOUSE_COLUMNS]
+
+
+def sales(scale, seed=2):
+    rng = np.random.default_rng(seed)
+    dishes = menu()
+    n = BASE_ROWS["sales"] * scale
+    rows = dishes.iloc[rng.integers(0, len(dishes), n)].reset_index(drop=True)
+    dates = ISSUE_DAYS[np.sort(rng.integers(0, len(ISSUE_DAYS), n))]
+
+    df = pd.DataFrame({
+        "Date": dates,
+        "Timestamp": dates + pd.to_timedelta(rng.integers(8 * 3600, 23 * 3600, n), unit="s"),
+        "Invoice No.": np.arange(n) // 2,
+        "Payment Type": rng.choice(["UPI", "Card", "Cash"], n),
+        "Order Type": rng.choice(ORDER_TYPES, n),
+        "Item Name": rows["Item Name"],
+        "Price": rng.choice([180, 220, 250, 320], n),
+        "Qty.": rng.integers(1, 4, n),
+        "Category": rows["Category"],
+        "Group Name": "Beverages",
+        "Status": "Success",
+    })
+    return df[SALES_COLUMNS]
+
+
+def generate(scale, seed=0):
+    # The three raw sheets at `scale` x the base volume
+    items = catalogue(scale)
+    return {
+        "stock": stock_take(scale, seed, items),
+        "warehouse": issues(scale, seed + 1, items),
+        "sales": sales(scale, seed + 2),
+    }
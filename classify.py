@@ -0,0 +1,92 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import recipes
+
+# Classification stage, run once when a sheet is preprocessed (pipeline.preprocess_*).
+# Tags are stored as compact columns so pages filter / group on them instead of
+# re-running regexes over item names and order types.
+#
+#   inventory: cup_type  "cup" / "lid" (anything named CUP or LID), cup_size e.g. "250 ml", "90 mm"
+#   sales:     channel   "dine in" / "takeaway", cup_consuming (registry cup rule applies)
+
+CUP_TYPES = ["cup", "lid"]
+CHANNELS = recipes.CHANNELS
+
+_SIZE = re.compile(r"(\d+)\s*(ML|MM)\b", re.IGNORECASE)
+
+_cup_keys = {}
+
+
+def _cup_type_rule(names):
+    upper = names.str.upper()
+    is_lid = upper.str.contains("LID", regex=False) & ~upper.str.contains("WITH LID", regex=False)
+    is_cup = upper.str.contains("CUP", regex=False)
+    return np.select([is_lid, is_cup], ["lid", "cup"], default=None)
+
+
+def _cup_size_rule(names):
+    size = names.str.extract(_SIZE)
+    return (size[0] + " " + size[1].str.lower()).where(size[0].notna())
+
+
+def cup_size(names):
+    # "CUP LIDS (250 ML)" -> "250 ml", "Lid 90 mm" -> "90 mm", no size -> NaN
+    return _cup_size_rule(pd.Series(names, dtype="string").fillna("")).astype(object)
+
+
+def tag_inventory(stock, name_col="item name :"):
+    # Rules run once per unique item name
+    names = stock[name_col].astype("string")
+    codes, uniques = pd.factorize(names)
+    uniques = pd.Series(uniques, dtype="string").fillna("")
+    cup_type = pd.Series(_cup_type_rule(uniques), dtype=object)
+    cup_size = _cup_size_rule(uniques).where(cup_type.notna())
+
+    def broadcast(values, categories):
+        values = np.append(values.to_numpy(dtype=object), None)
+        return pd.Categorical(values[codes], categories=categories)
+
+    stock["cup_type"] = broadcast(cup_type, CUP_TYPES)
+    stock["cup_size"] = broadcast(cup_size, sorted(cup_size.dropna().unique()))
+    return stock
+
+
+def _cup_rule_keys():
+    # channel -> item names / categories with a cup rule in recipes.csv (compiled once per process)
+    if not _cup_keys:
+        compiled = recipes.compile_registry(recipes.load_registry())
+        for ch in CHANNELS:
+            _cup_keys[ch] = {
+                "item": recipes.keys_for(compiled, "cup", match="item", channel=ch),
+                "category": recipes.keys_for(compiled, "cup", match="category", channel=ch),
+            }
+    return _cup_keys
+
+
+def channel(order_type):
+    # Dine In vs everything else (Delivery, Pick Up, Parcel, Takeaway ...)
+    dine_in = order_type.astype(str).str.lower().str.contains("dine in", regex=False, na=False)
+    return pd.Categorical(np.where(dine_in, "dine in", "takeaway"), categories=CHANNELS)
+
+
+def tag_sales(sales, item_col=None):
+    if "order type" in sales.columns:
+        sales["channel"] = channel(sales["order type"])
+    else:
+        sales["channel"] = pd.Categorical(["takeaway"] * len(sales), categories=CHANNELS)
+
+    category = sales["category"].astype(str).str.lower().str.strip() if "category" in sales.columns else None
+    item = sales[item_col].astype(str).str.lower().str.strip() if item_col else None
+    cup = np.zeros(len(sales), dtype=bool)
+    for ch, keys in _cup_rule_keys().items():
+        hit = np.zeros(len(sales), dtype=bool)
+        if category is not None:
+            hit |= category.isin(keys["category"]).to_numpy()
+        if item is not None:
+            hit |= item.isin(keys["item"]).to_numpy()
+        cup |= hit & (sales["channel"] == ch).to_numpy()
+    sales["cup_consuming"] = cup
+    return sales
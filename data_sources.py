@@ -0,0 +1,205 @@
+import argparse
+import functools
+import http.server
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Where the raw sheets come from. snapshot_cache.fetch_payload asks this module for the
+# bytes of a source, so every loader (app, reconcile_cli, parallel_loader, sales_store)
+# works the same whatever the backend:
+#
+#   google   Google Sheets xlsx export (sheet_id in snapshot_cache.SOURCES), the default
+#   xlsx     a local workbook, e.g. the bundled Stock Take / Issue Details files
+#   parquet  a local Parquet copy of the sheet (python data_sources.py export-parquet)
+#   http     <http_url>/<file name>; python data_sources.py serve is a local stand-in
+#            for the Google export (no network latency, reproducible load times)
+#
+# DATA_SOURCE sets the backend for every source. data_sources.json (DATA_SOURCES_CONFIG)
+# can set it per source and point at other files:
+#   {"default": "xlsx",
+#    "http_url": "http://127.0.0.1:8765",
+#    "sources": {"sales": {"backend": "xlsx", "path": "exports/petpooja.xlsx"}}}
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CONFIG_PATH = os.environ.get("DATA_SOURCES_CONFIG", os.path.join(ROOT, "data_sources.json"))
+
+BACKENDS = ["google", "xlsx", "parquet", "http"]
+
+# Local file per source (relative to DATA_DIR); the PetPooja export is not bundled
+LOCAL_FILES = {
+    "stock": "Stock Take.xlsx",
+    "warehouse": "Issue Details ( AUG - DEC ).xlsx",
+    "sales": "Mulla House ( AUG - DEC 18 ) PetPooja.xlsx",
+}
+
+DEFAULT_CONFIG = {
+    "default": os.environ.get("DATA_SOURCE", "google"),
+    "data_dir": os.environ.get("DATA_DIR", ROOT),
+    "parquet_dir": os.environ.get("DATA_PARQUET_DIR", os.path.join(ROOT, "data")),
+    "http_url": os.environ.get("DATA_HTTP_URL", "http://127.0.0.1:8765"),
+    "sources": {},
+}
+
+
+def load_config(path=CONFIG_PATH):
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    except OSError:
+        pass
+    # The environment wins over the file, so one run can switch backend without editing it
+    if "DATA_SOURCE" in os.environ:
+        config["default"] = os.environ["DATA_SOURCE"]
+    return config
+
+
+CONFIG = load_config()
+
+
+def spec_for(source):
+    # {"backend", "path" or "url"} for one source
+    spec = dict(CONFIG["sources"].get(source, {}))
+    backend = spec.setdefault("backend", CONFIG["default"])
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown data source backend {backend!r} for {source} (expected one of {', '.join(BACKENDS)})")
+
+    if backend == "xlsx":
+        name = spec.get("path") or LOCAL_FILES.get(source)
+        if name is None:
+            raise ValueError(f"No local workbook configured for {source} (data_sources.json sources.{source}.path)")
+        spec["path"] = os.path.join(CONFIG["data_dir"], name)
+    elif backend == "parquet":
+        spec["path"] = os.path.join(CONFIG["parquet_dir"], spec.get("path") or f"{source}.parquet")
+    elif backend == "http":
+        name = spec.get("path") or LOCAL_FILES.get(source, f"{source}.xlsx")
+        spec.setdefault("url", f"{CONFIG['http_url'].rstrip('/')}/{urllib.parse.quote(name)}")
+    return spec
+
+
+def payload_format(source):
+    # How snapshot_cache.parse_payload should read the bytes
+    return "parquet" if spec_for(source)["backend"] == "parquet" else "xlsx"
+
+
+def http_get(url, previous=None, timeout=60):
+    # (bytes, validators) for a URL, or (None, previous) when the server answers
+    # 304 Not Modified to the ETag / Last-Modified of the previous download
+    request = urllib.request.Request(url)
+    if previous and previous.get("etag"):
+        request.add_header("If-None-Match", previous["etag"])
+    if previous and previous.get("last_modified"):
+        request.add_header("If-Modified-Since", previous["last_modified"])
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            return response.read(), validators
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, previous
+        raise
+
+
+def file_validators(path):
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def fetch(spec, previous=None, timeout=60):
+    # (bytes, validators) for a local / http spec (the google backend is fetched by
+    # snapshot_cache). Bytes are None when the source is unchanged since `previous`:
+    # same ETag / Last-Modified over HTTP, same mtime and size for a local file
+    if spec["backend"] == "http":
+        return http_get(spec["url"], previous, timeout)
+    validators = file_validators(spec["path"])
+    if previous and all(previous.get(k) == v for k, v in validators.items()):
+        return None, validators
+    with open(spec["path"], "rb") as f:
+        return f.read(), validators
+
+
+def describe(source):
+    spec = spec_for(source)
+    if spec["backend"] == "google":
+        return "google"
+    return f"{spec['backend']}: {spec.get('path') or spec.get('url')}"
+
+
+def make_server(port=8765, directory=None, quiet=False):
+    # Local stand-in for the Google export: serves the local workbooks over HTTP (port 0 = any free port)
+    handler_class = _QuietHandler if quiet else http.server.SimpleHTTPRequestHandler
+    handler = functools.partial(handler_class, directory=directory or CONFIG["data_dir"])
+    return http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=8765, directory=None):
+    directory = directory or CONFIG["data_dir"]
+    server = make_server(port, directory)
+    print(f"Serving {directory} on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def export_parquet(sources=None, out_dir=None):
+    # Current snapshots -> <parquet_dir>/<source>.parquet, for the parquet backend
+    import outlets  # registers per-outlet sources
+    import snapshot_cache  # imports this module
+
+    out_dir = out_dir or CONFIG["parquet_dir"]
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for source in sources or list(snapshot_cache.SOURCES):
+        try:
+            df = snapshot_cache.load_source(source)
+        except Exception as e:
+            print(f"{source}: skipped ({e})")
+            continue
+        path = os.path.join(out_dir, f"{source}.parquet")
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        written.append(path)
+        print(f"{source}: {len(df):,} rows -> {path}")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prepare the data source backends.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="print the backend each source uses")
+    serve_cmd = commands.add_parser("serve", help="serve the local workbooks over HTTP (http backend)")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+    serve_cmd.add_argument("--dir", default=None, help="folder to serve (default: data_dir)")
+    export_cmd = commands.add_parser("export-parquet", help="write the current snapshots as Parquet (parquet backend)")
+    export_cmd.add_argument("--out", default=None)
+    export_cmd.add_argument("sources", nargs="*")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        import outlets  # registers per-outlet sources
+        import snapshot_cache
+        for source in snapshot_cache.SOURCES:
+            try:
+                print(f"{source:<20} {describe(source)}")
+            except ValueError as e:
+                print(f"{source:<20} error: {e}")
+    elif args.command == "serve":
+        serve(args.port, args.dir)
+    elif args.command == "export-parquet":
+        export_parquet(args.sources or None, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+import profiling
+
+# Derived tables (summaries, the reconciliation cube, per-month page tables) as a small
+# computation graph.
+#
+# A source is a raw input known only by its fingerprint (a snapshot's content hash, the
+# sales store version). A table is built from sources and other tables, declared as its
+# inputs. Its key hashes its name, its own params (outlet, month, ...) and its inputs'
+# keys, so when the warehouse sheet changes only the tables that read it, directly or
+# through another table, get a new key and are rebuilt; the stock summary and the sales
+# aggregates keep theirs.
+#
+# Built tables stay in memory, least recently used evicted first (MAX_ENTRIES, MAX_MB).
+# With DERIVED_CACHE_DIR set, evicted tables are pickled there and read back on the next
+# miss. Tables are shared, not copied: builders and callers must not modify them in place.
+
+MAX_ENTRIES = int(os.environ.get("DERIVED_CACHE_ENTRIES", 128))
+MAX_MB = float(os.environ.get("DERIVED_CACHE_MB", 512))
+SPILL_DIR = os.environ.get("DERIVED_CACHE_DIR") or None
+
+STATS_COLUMNS = ["Table", "Hits", "Spill hits", "Builds", "Build (ms)", "Spill errors"]
+
+NODES = {}
+
+_lock = threading.Lock()
+_memory = OrderedDict()  # key -> (name, value, MB)
+_stats = {}
+
+
+def source(name, fingerprint, params=("outlet",)):
+    # fingerprint(**params) -> anything repr-able that changes whenever the data does
+    NODES[name] = {"kind": "source", "fingerprint": fingerprint, "params": list(params)}
+
+
+def table(inputs=(), params=("outlet",), name=None, version=1):
+    # Decorator: build(**input tables, **params). Source inputs only take part in the key.
+    # Bump `version` when the builder's output changes and tables are spilled to disk.
+    def decorate(fn):
+        NODES[name or fn.__name__] = {
+            "kind": "table", "build": fn, "inputs": list(inputs), "params": list(params), "version": version,
+        }
+        return fn
+    return decorate
+
+
+def _own(node, params):
+    return {p: params[p] for p in node["params"]}
+
+
+def key(name, params, _keys=None):
+    # _keys: keys already computed in this lookup (sources are read once per get)
+    _keys = {} if _keys is None else _keys
+    if name not in _keys:
+        node = NODES[name]
+        own = _own(node, params)
+        if node["kind"] == "source":
+            parts = node["fingerprint"](**own)
+        else:
+            parts = (node["version"], [key(i, params, _keys) for i in node["inputs"]])
+        _keys[name] = hashlib.sha1(repr((name, sorted(own.items()), parts)).encode()).hexdigest()
+    return _keys[name]
+
+
+def _size_mb(value):
+    # Shallow size (no string scan), what the MAX_MB budget counts
+    if isinstance(value, pd.DataFrame):
+        return value.memory_usage(index=True).sum() / 1e6
+    if isinstance(value, pd.Series):
+        return value.memory_usage(index=True) / 1e6
+    return 0.0
+
+
+def _spill_path(name, k):
+    return os.path.join(SPILL_DIR, f"{name}-{k}.pkl")
+
+
+def _count(name, field, amount=1):
+    with _lock:
+        stats = _stats.setdefault(name, {"Hits": 0, "Spill hits": 0, "Builds": 0, "Build (ms)": 0.0, "Spill errors": 0})
+        stats[field] += amount
+
+
+def _remember(name, k, value):
+    evicted = []
+    with _lock:
+        _memory[k] = (name, value, _size_mb(value))
+        _memory.move_to_end(k)
+        total = sum(entry[2] for entry in _memory.values())
+        while len(_memory) > 1 and (len(_memory) > MAX_ENTRIES or total > MAX_MB):
+            old_key, old = _memory.popitem(last=False)
+            total -= old[2]
+            evicted.append((old_key, old))
+    if SPILL_DIR:
+        for old_key, (old_name, old_value, _) in evicted:
+            path = _spill_path(old_name, old_key)
+            if os.path.exists(path):
+                continue
+            try:
+                os.makedirs(SPILL_DIR, exist_ok=True)
+                with open(path + ".tmp", "wb") as f:
+                    pickle.dump(old_value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + ".tmp", path)
+            except (OSError, pickle.PicklingError):
+                # Counted in stats_frame (the app's cache panel); the table is rebuilt on its next miss
+                _count(old_name, "Spill errors")
+
+
+def _from_spill(name, k):
+    if not SPILL_DIR:
+        return False, None
+    try:
+        with open(_spill_path(name, k), "rb") as f:
+            return True, pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return False, None
+
+
+def scratch(*params):
+    # For a bulk job over many values of `params` (export.py: every month). Tables that
+    # depend on them are kept in this dict only, not in the shared memory, so they go away
+    # with it; tables that do not (the cube, the item index) are shared as usual.
+    return {"params": set(params), "tables": {}}
+
+
+def get(name, _keys=None, _scratch=None, **params):
+    # The table for these params, built (with whatever inputs are missing) on a miss.
+    # Two sessions missing the same table at once may both build it; the last one is kept.
+    _keys = {} if _keys is None else _keys
+    node = NODES[name]
+    k = key(name, params, _keys)
+    with _lock:
+        hit = _memory.get(k)
+        if hit is not None:
+            _memory.move_to_end(k)
+    if hit is not None:
+        _count(name, "Hits")
+        return hit[1]
+    transient = _scratch is not None and bool(_scratch["params"] & set(node["params"]))
+    if transient and k in _scratch["tables"]:
+        _count(name, "Hits")
+        return _scratch["tables"][k]
+
+    found, value = _from_spill(name, k)
+    if found:
+        _count(name, "Spill hits")
+    else:
+        inputs = {i: get(i, _keys, _scratch, **params) for i in node["inputs"] if NODES[i]["kind"] == "table"}
+        start = time.perf_counter()
+        with profiling.span(name, cache="miss"):
+            value = node["build"](**inputs, **_own(node, params))
+        _count(name, "Builds")
+        _count(name, "Build (ms)", 1000 * (time.perf_counter() - start))
+    if transient:
+        _scratch["tables"][k] = value
+    else:
+        _remember(name, k, value)
+    return value
+
+
+def clear():
+    # In-memory tables only; the spill folder is keyed by content and stays valid
+    with _lock:
+        _memory.clear()
+        _stats.clear()
+
+
+def stats_frame():
+    # Per table: memory hits, hits read back from the spill folder, builds and their time,
+    # evicted tables that could not be written to the spill folder
+    rows = [{"Table": name, **stats} for name, stats in _stats.items()]
+    return pd.DataFrame(rows, columns=STATS_COLUMNS).sort_values("Table").reset_index(drop=True)
+
+
+def memory_frame():
+    with _lock:
+        entries = list(_memory.values())
+    rows = [{"Table": name, "Memory (MB)": mb} for name, _, mb in entries]
+    return pd.DataFrame(rows, columns=["Table", "Memory (MB)"])
@@ -0,0 +1,77 @@
+import importlib.util
+import io
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Pluggable XLSX reader.
+#
+# Engines:
+#   "calamine"        Rust parser via python-calamine (optional dependency, fastest)
+#   "openpyxl-stream" openpyxl read-only row streaming, only the wanted columns are materialised
+#   "openpyxl"        plain pd.read_excel (previous behaviour)
+#
+# `columns` is a predicate on the header text (e.g. schema.wants_column) used for projection.
+
+ENGINES = ["calamine", "openpyxl-stream", "openpyxl"]
+
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+# Override with XLSX_ENGINE=openpyxl (etc.) to pin an engine
+DEFAULT_ENGINE = os.environ.get("XLSX_ENGINE") or ("calamine" if HAS_CALAMINE else "openpyxl-stream")
+
+
+def available_engines():
+    return [e for e in ENGINES if e != "calamine" or HAS_CALAMINE]
+
+
+def _usecols(columns):
+    if columns is None:
+        return None
+    return lambda name: columns(str(name))
+
+
+def _read_stream(src, sheet_name, columns):
+    wb = load_workbook(src, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+
+        names = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        keep = [i for i, name in enumerate(names) if columns is None or columns(name)]
+        width = len(names)
+        data = [
+            [row[i] if i < len(row) else None for i in keep]
+            for row in rows
+            if row is not None and any(v is not None for v in row[:width])
+        ]
+        return pd.DataFrame(data, columns=[names[i] for i in keep]).infer_objects()
+    finally:
+        wb.close()
+
+
+def read_header(src, sheet_name=0, engine=None):
+    # Every column name of the sheet (no projection), only the first row is read
+    engine = engine or DEFAULT_ENGINE
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+    if engine == "openpyxl-stream":
+        engine = "openpyxl"
+    return [str(c) for c in pd.read_excel(src, sheet_name=sheet_name, nrows=0, engine=engine).columns]
+
+
+def read_excel(src, sheet_name=0, columns=None, engine=None):
+    # src: path or bytes
+    engine = engine or DEFAULT_ENGINE
+    if isinstance(src, (bytes, bytearray)):
+        src = io.BytesIO(src)
+
+    if engine == "openpyxl-stream":
+        return _read_stream(src, sheet_name, columns)
+    if engine in ("calamine", "openpyxl"):
+        return pd.read_excel(src, sheet_name=sheet_name, usecols=_usecols(columns), engine=engine)
+    raise ValueError(f"Unknown XLSX engine: {engine}")
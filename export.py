@@ -0,0 +1,145 @@
+import os
+import zipfile
+
+from openpyxl import Workbook
+
+import snapshot_cache
+
+# Bulk export of the app's per-month reconciliation tables (stock, coffee, syrup litres,
+# cup summary and breakdowns) for any number of months.
+#
+# Months are produced and written one at a time: tables(month) builds that month's tables,
+# every writer appends them, and they are dropped before the next month is built. The
+# writers never hold more than the month in hand:
+#
+#   parquet  <out>/<table>/month=2025-11/part-0.parquet, a Hive-partitioned dataset
+#            (pd.read_parquet("<out>/stock") reads every month back, month as a column)
+#   csv      <out>/<table>.csv, appended month by month, header once
+#   xlsx     <out>/reconciliation.xlsx, one sheet per table, written with openpyxl's
+#            write-only mode (rows go to temp files, not an in-memory workbook)
+
+FORMATS = ["parquet", "csv", "xlsx"]
+
+# Exports from the app go to <OUT_DIR>/<outlet>-<timestamp>/
+OUT_DIR = os.environ.get("EXPORT_DIR", "exports")
+
+# Rows per sheet, header included (Excel's limit); longer tables continue on "<table> (2)"
+XLSX_MAX_ROWS = 1_048_576
+
+
+def _prepared(frame, month):
+    # Month column first; Periods are not a Parquet/CSV/Excel type, "2025-11" strings are
+    frame = frame.assign(month=str(month))
+    return frame[["month"] + [c for c in frame.columns if c != "month"]]
+
+
+class ParquetPartitions:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.paths = []
+
+    def write(self, name, month, frame):
+        folder = os.path.join(self.out_dir, name, f"month={month}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "part-0.parquet")
+        # The month is the partition folder; keeping it in the file too breaks the read back
+        snapshot_cache.arrow_safe(frame.drop(columns="month")).to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        self.paths.append(path)
+
+    def close(self):
+        return sorted({os.path.dirname(os.path.dirname(p)) for p in self.paths})
+
+
+class CsvStream:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.files = {}
+        self.columns = {}
+
+    def write(self, name, month, frame):
+        if name not in self.files:
+            path = os.path.join(self.out_dir, f"{name}.csv")
+            self.files[name] = open(path, "w", newline="", encoding="utf-8")
+            self.columns[name] = list(frame.columns)
+            frame.to_csv(self.files[name], index=False)
+        else:
+            # Same columns in the same order as the header, whatever a month's frame has
+            frame.reindex(columns=self.columns[name]).to_csv(self.files[name], index=False, header=False)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        return [f.name for f in self.files.values()]
+
+
+class XlsxStream:
+    def __init__(self, out_dir):
+        self.path = os.path.join(out_dir, "reconciliation.xlsx")
+        self.workbook = Workbook(write_only=True)
+        self.sheets = {}  # table -> [sheet, rows written, part, columns]
+
+    def _new_sheet(self, name, part, columns):
+        # Sheet names: at most 31 characters
+        title = (name if part == 1 else f"{name} ({part})")[:31]
+        sheet = self.workbook.create_sheet(title)
+        sheet.append(columns)
+        self.sheets[name] = [sheet, 1, part, columns]
+
+    def write(self, name, month, frame):
+        if name not in self.sheets:
+            self._new_sheet(name, 1, list(frame.columns))
+        columns = self.sheets[name][3]
+        # NaN is not an Excel value (openpyxl would write it as a number); empty cells instead
+        values = frame.reindex(columns=columns).astype(object)
+        values = values.where(values.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self.sheets[name][1] >= XLSX_MAX_ROWS:
+                self._new_sheet(name, self.sheets[name][2] + 1, columns)
+            self.sheets[name][0].append(row)
+            self.sheets[name][1] += 1
+
+    def close(self):
+        if not self.sheets:
+            return []
+        self.workbook.save(self.path)
+        return [self.path]
+
+
+WRITERS = {"parquet": ParquetPartitions, "csv": CsvStream, "xlsx": XlsxStream}
+
+
+def export(months, tables, out_dir, formats=("parquet",), progress=None):
+    # tables(month) -> {table name: frame or None}; progress(done, total, month) after each month.
+    # Returns the written paths (Parquet: one dataset folder per table).
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s) {', '.join(unknown)} (expected {', '.join(FORMATS)})")
+    os.makedirs(out_dir, exist_ok=True)
+    writers = [WRITERS[fmt](out_dir) for fmt in formats]
+    try:
+        for done, month in enumerate(months, start=1):
+            for name, frame in tables(month).items():
+                if frame is None or frame.empty:
+                    continue
+                frame = _prepared(frame, month)
+                for writer in writers:
+                    writer.write(name, month, frame)
+            if progress is not None:
+                progress(done, len(months), month)
+    finally:
+        written = [path for writer in writers for path in writer.close()]
+    return written
+
+
+def zip_folder(folder, path=None):
+    # One file to download; written to disk entry by entry, not built in memory
+    path = path or folder.rstrip(os.sep) + ".zip"
+    with zipfile.ZipFile(path + ".tmp", "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for root, _, files in os.walk(folder):
+            for file in sorted(files):
+                full = os.path.join(root, file)
+                archive.write(full, os.path.relpath(full, folder))
+    os.replace(path + ".tmp", path)
+    return path
+
@@ -0,0 +1,49 @@
+import numpy as np
+
+# Sidebar / page filter lookups, built once per stock snapshot (app item_index table).
+# Widgets and page filters read these lists instead of scanning the stock frame on every rerun.
+
+# Item classes: cups / lids from the classify.py tags, syrups and coffee by category
+# (same rules the pages used). An item can be in more than one class.
+CATEGORY_CLASSES = {
+    "syrup": "SYRUP",
+    "coffee": "TEAS & COFFEES",
+}
+
+
+def build(stock):
+    # stock: pipeline.preprocess_data output (all months)
+    items = stock[["item name :", "category :"]].dropna(subset=["item name :"]).astype(str)
+    items = items.drop_duplicates()
+    tags = stock.loc[items.index]
+    # By label: after outlets.for_outlet the index is not 0..n-1
+    has_category = stock.loc[items.index, "category :"].notna().to_numpy() if len(items) else np.array([], dtype=bool)
+
+    by_category = items[has_category].groupby("category :", sort=False)["item name :"]
+    index = {
+        "months": sorted(stock["month"].dropna().astype(str).unique(), reverse=True),
+        "categories": [str(c) for c in stock["category :"].dropna().unique()],
+        "items_by_category": {cat: sorted(names.unique()) for cat, names in by_category},
+        "all_items": sorted(items["item name :"].unique()),
+        "classes": {},
+        # item name -> "250 ml" etc. for cups and lids
+        "cup_size": dict(zip(tags["item name :"].astype(str), tags["cup_size"].astype(object))) if "cup_size" in tags else {},
+    }
+    if "cup_type" in tags:
+        for cls in ["cup", "lid"]:
+            index["classes"][cls] = sorted(tags.loc[tags["cup_type"] == cls, "item name :"].astype(str).unique())
+    for cls, text in CATEGORY_CLASSES.items():
+        hit = items["category :"].str.contains(text, case=False, regex=False, na=False).to_numpy() & has_category
+        index["classes"][cls] = sorted(items.loc[hit, "item name :"].unique())
+    return index
+
+
+def items_for(index, categories):
+    # Item multiselect options for the selected categories (all items when none is selected)
+    if not categories:
+        return index["all_items"]
+    return sorted({name for cat in categories for name in index["items_by_category"].get(str(cat), [])})
+
+
+def class_items(index, *classes):
+    return sorted({name for cls in classes for name in index["classes"].get(cls, [])})
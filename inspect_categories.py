@@ -1,11 +1,11 @@
 import pandas as pd
 
+import snapshot_cache
+
 def load_data():
     try:
-        # Stock Take Sheet
-        sheet_id = "1mKcRWrkCMHXOpofdjU1MrwRmhUGaaET8RUOG6eyHAqA"
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
-        stock = pd.read_excel(url)
+        # Stock Take Sheet (shared snapshot cache with app.py)
+        stock = snapshot_cache.load_source("stock")
         return stock
     except Exception as e:
         print(f"Error loading Stock Data: {e}")
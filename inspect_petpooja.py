@@ -1,15 +1,18 @@
 import pandas as pd
 
+import snapshot_cache
+
 try:
-    file_path = "Mulla House ( AUG - DEC 18 ) PetPooja.xlsx"
-    df = pd.read_excel(file_path)
+    # PetPooja export ("MULLA HOUSE" tab) from the shared snapshot cache
+    df = snapshot_cache.load_source("sales")
     
     # Clean columns
     df.columns = df.columns.str.lower().str.strip()
     
+    # Every column of the sheet; the snapshot keeps only the ones the app reads
     print("Columns found:")
-    for c in df.columns:
-        print(c)
+    for c in snapshot_cache.sheet_columns("sales") or list(df.columns):
+        print(c if c.lower().strip() in df.columns else f"{c} (not kept)")
 
 
 except Exception as e:
@@ -1,11 +1,11 @@
 import pandas as pd
 import re
 
+import snapshot_cache
+
 def load_data():
     try:
-        sheet_id = "1mKcRWrkCMHXOpofdjU1MrwRmhUGaaET8RUOG6eyHAqA"
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
-        stock = pd.read_excel(url)
+        stock = snapshot_cache.load_source("stock")
         return stock
     except Exception as e:
         print(f"Error: {e}")
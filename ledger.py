@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+import profiling
+import recipes
+import syrup_matching
+import syrup_names
+
+# Daily running stock ledger.
+#
+# Stock takes, warehouse issues and recipe-based sales deductions are merged into one event
+# stream per item. A stock take resets the balance to the counted quantity (it starts a new
+# segment); between counts the balance is a grouped cumulative sum of issues (+) and sales
+# deductions (-). Any date range is then reconciled from the item x day balance matrix,
+# without re-aggregating the raw sheets.
+
+LEDGER_COLUMNS = ["item code", "date", "event", "qty", "month_end_risk", "segment", "balance", "adjustment"]
+
+# Same-day order: goods in, sales out, then the count (a stock take is that day's closing)
+EVENT_ORDER = {"issue": 0, "sales": 1, "stock take": 2}
+
+
+def stock_take_events(stock):
+    # stock: pipeline.preprocess_data output
+    events = pd.DataFrame({
+        "item code": stock["item code :"].astype(str),
+        "date": pd.to_datetime(stock["inventory date :"]).dt.normalize(),
+        "qty": pd.to_numeric(stock["physical quantity :"], errors="coerce").fillna(0).astype(float),
+    })
+    # Several count lines for one item on one day add up (same as get_stock_summary)
+    events = events.groupby(["item code", "date"], as_index=False)["qty"].sum()
+    return events.assign(event="stock take")
+
+
+def issue_events(warehouse):
+    # warehouse: pipeline.preprocess_warehouse output
+    dates = pd.to_datetime(warehouse["issue date :"])
+    return pd.DataFrame({
+        "item code": warehouse["item code"].astype(str),
+        "date": dates.dt.normalize(),
+        "qty": pd.to_numeric(warehouse["issue quantity :"], errors="coerce").fillna(0).astype(float),
+        "event": "issue",
+        # Monthly Stock.ipynb cut-off rule: issued on the last two days of the month
+        "month_end_risk": (dates.dt.day >= dates.dt.days_in_month - 1).to_numpy(),
+    })
+
+
+@profiling.timed()
+def syrup_deductions(daily_rollup, compiled, stock):
+    # Recipe syrup (ml) per day -> bottles of the matching inventory item.
+    # daily_rollup: sales_rollup.rollup_sales(..., period="day")
+    expected = recipes.expected_consumption(compiled, daily_rollup, kind="syrup", by="day")
+    expected = expected[expected["expected_qty"] > 0]
+    syrups = stock[stock["category :"].astype(str).str.contains("SYRUP", case=False, na=False)]
+    syrups = syrups[["item code :", "item name :"]].astype(str).drop_duplicates("item name :")
+    if expected.empty or syrups.empty:
+        return pd.DataFrame(columns=["item code", "date", "qty"])
+
+    matches = syrup_matching.resolve(expected["ingredient"], syrup_matching.build_index(syrups["item name :"]))
+    item_name = expected["ingredient"].map(syrup_matching.mapping(matches))
+    bottle_ml = dict(zip(syrups["item name :"], syrup_names.bottle_size_ml(syrups["item name :"])))
+    code_of = dict(zip(syrups["item name :"], syrups["item code :"]))
+
+    known = item_name.notna().to_numpy()
+    deductions = pd.DataFrame({
+        "item code": item_name[known].map(code_of),
+        "date": pd.to_datetime(expected["day"][known]),
+        "qty": expected["expected_qty"][known] / item_name[known].map(bottle_ml),
+    })
+    return deductions.groupby(["item code", "date"], as_index=False)["qty"].sum()
+
+
+@profiling.timed()
+def build_ledger(stock, warehouse=None, deductions=None):
+    parts = [stock_take_events(stock)]
+    if warehouse is not None and not warehouse.empty:
+        parts.append(issue_events(warehouse))
+    if deductions is not None and not deductions.empty:
+        parts.append(deductions.assign(event="sales"))
+    events = pd.concat(parts, ignore_index=True)
+    events["month_end_risk"] = events.get("month_end_risk", False)
+    events["month_end_risk"] = events["month_end_risk"].fillna(False).astype(bool)
+
+    events["order"] = events["event"].map(EVENT_ORDER)
+    events = events.sort_values(["item code", "date", "order"], kind="stable").reset_index(drop=True)
+
+    is_count = (events["event"] == "stock take").to_numpy()
+    signed = np.where(events["event"] == "sales", -events["qty"], events["qty"])
+    # A count starts a new segment and carries the counted qty as its first value
+    events["segment"] = pd.Series(is_count.astype(int)).groupby(events["item code"]).cumsum()
+    events["balance"] = pd.Series(signed).groupby([events["item code"], events["segment"]]).cumsum()
+
+    # Count - running balance just before it (the loss / gain the count reveals)
+    before = events.groupby("item code")["balance"].shift(1).fillna(0)
+    events["adjustment"] = np.where(is_count, events["qty"] - before, 0.0)
+    return events[LEDGER_COLUMNS]
+
+
+def daily_balances(ledger, start=None, end=None):
+    # item code x day closing balances, carried forward over days without events
+    closing = ledger.groupby(["item code", "date"])["balance"].last().unstack("date")
+    start = closing.columns.min() if start is None else pd.Timestamp(start)
+    end = closing.columns.max() if end is None else pd.Timestamp(end)
+    days = pd.date_range(start, end, freq="D")
+    # Keep the earlier columns while filling so a range starts from the last known balance
+    wide = closing.reindex(columns=closing.columns.union(days)).ffill(axis=1)
+    return wide.reindex(columns=days).fillna(0)
+
+
+@profiling.timed()
+def reconcile_range(ledger, start, end):
+    # Opening + Issued - Sales Deductions + Count Adjustments = Closing, per item
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    balances = daily_balances(ledger, start - pd.Timedelta(days=1), end)
+    in_range = ledger[(ledger["date"] >= start) & (ledger["date"] <= end)]
+    flows = in_range.pivot_table(index="item code", columns="event", values="qty", aggfunc="sum", fill_value=0)
+
+    report = pd.DataFrame({
+        "Opening Balance": balances.iloc[:, 0],
+        "Issued": flows.get("issue"),
+        "Month-End Issues": in_range[in_range["month_end_risk"]].groupby("item code")["qty"].sum(),
+        "Sales Deductions": flows.get("sales"),
+        "Count Adjustments": in_range.groupby("item code")["adjustment"].sum(),
+        "Closing Balance": balances.iloc[:, -1],
+    })
+    report = report.fillna(0)
+    # Items with no balance and no movement in the range are left out
+    report = report[(report != 0).any(axis=1)]
+    return report.rename_axis("Item Code").reset_index()
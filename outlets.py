@@ -0,0 +1,92 @@
+import json
+import os
+
+import snapshot_cache
+
+# Outlet registry. Every outlet is reconciled as its own shard (pipeline.build_all_reports).
+#
+# outlets.json maps an outlet key to:
+#   label        display name
+#   cost_center  text matched (case-insensitive) in the stock take / issue "cost center" columns,
+#                so outlets can share one Stock Take and one Issue Details workbook
+#   stock, warehouse, sales
+#                either the name of an existing snapshot_cache source ("stock", "sales", ...)
+#                or {"sheet_id": ..., "sheet_name": ...} for a workbook of its own, which is
+#                registered as the source "<kind>_<outlet key>"
+
+CONFIG_PATH = os.environ.get(
+    "OUTLETS_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "outlets.json"),
+)
+
+KINDS = ["stock", "warehouse", "sales"]
+
+# Used when there is no outlets.json (the original single store setup)
+DEFAULT_OUTLETS = {
+    "mulla-house": {
+        "label": "Mulla House",
+        "cost_center": "MULLA HOUSE",
+        "stock": "stock",
+        "warehouse": "warehouse",
+        "sales": "sales",
+    },
+}
+
+# Cost center column per kind (after lower().strip())
+COST_CENTER_COLUMNS = {
+    "stock": "cost center :",
+    "warehouse": "requesting cost center :",
+}
+
+
+def load_outlets(path=CONFIG_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except OSError:
+        return json.loads(json.dumps(DEFAULT_OUTLETS))
+
+
+def _register(outlets):
+    for key, outlet in outlets.items():
+        for kind in KINDS:
+            spec = outlet.get(kind, kind)
+            if isinstance(spec, dict):
+                name = f"{kind}_{key.replace('-', '_')}"
+                snapshot_cache.SOURCES[name] = {
+                    "label": f"{snapshot_cache.SOURCES[kind]['label']} ({outlet.get('label', key)})",
+                    "kind": kind,
+                    "sheet_id": spec["sheet_id"],
+                    "sheet_name": spec.get("sheet_name", 0),
+                }
+                spec = name
+            outlet[kind] = spec
+    return outlets
+
+
+# Registered at import so worker processes see the same sources
+OUTLETS = _register(load_outlets())
+DEFAULT_OUTLET = next(iter(OUTLETS))
+
+
+def label(outlet):
+    return OUTLETS[outlet].get("label", outlet)
+
+
+def source_for(outlet, kind):
+    return OUTLETS[outlet][kind]
+
+
+def all_sources(outlet_keys=None):
+    keys = list(OUTLETS) if outlet_keys is None else outlet_keys
+    return list(dict.fromkeys(source_for(key, kind) for key in keys for kind in KINDS))
+
+
+def for_outlet(df, outlet, kind):
+    # Keep this outlet's rows of a (possibly shared) stock take / issue sheet
+    cost_center = OUTLETS[outlet].get("cost_center")
+    column = COST_CENTER_COLUMNS.get(kind)
+    if df is None or not cost_center or column not in df.columns:
+        return df
+    keep = df[column].astype(str).str.contains(cost_center, case=False, regex=False, na=False)
+    return df[keep.to_numpy()]
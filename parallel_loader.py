@@ -0,0 +1,138 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import outlets  # registers per-outlet sources (also inside worker processes)
+import profiling
+import sales_store
+import snapshot_cache
+
+# Concurrent refresh of the three workbooks.
+# Downloads run in threads (network bound), XLSX parsing runs in worker processes
+# (CPU bound, openpyxl holds the GIL) for the CLI and benchmarks, in threads inside the
+# app (use_processes=False). A failing source never blocks the others:
+# it keeps its last snapshot and the failure shows up in the timing report.
+# A sheet whose content did not change since its snapshot (see snapshot_cache) is not
+# parsed again; it shows up as "unchanged".
+
+REPORT_COLUMNS = ["Source", "Status", "Download (s)", "Parse (s)", "Total (s)", "Error"]
+
+
+def _download(source, meta):
+    # Conditional when the snapshot has validators; payload None = not modified
+    start = time.perf_counter()
+    payload, validators = snapshot_cache.fetch_payload(source, snapshot_cache.previous_validators(meta))
+    return payload, validators, time.perf_counter() - start
+
+
+def _parse(source, payload):
+    # Runs in a worker process
+    start = time.perf_counter()
+    df = snapshot_cache.parse_payload(source, payload)
+    return df, time.perf_counter() - start
+
+
+def _ingest_sales(source, force_refresh, ttl):
+    # (seconds, load report status); months rewritten for back-dated changes are named
+    start = time.perf_counter()
+    version = (sales_store.read_state(source) or {}).get("version")
+    state = sales_store.ingest(ttl=ttl, force_refresh=force_refresh, source=source)
+    status = "ingested"
+    if state["version"] != version and state.get("rebuilt_months"):
+        status = f"ingested, rebuilt {', '.join(state['rebuilt_months'])} (back-dated changes)"
+    return time.perf_counter() - start, status
+
+
+def cpu_pool(use_processes, workers):
+    # Also used for the per-outlet shards (pipeline.build_all_reports)
+    if use_processes:
+        try:
+            # Workers come from a forkserver, never forked from this (threaded) process: a child
+            # forked while another thread holds a lock (an import lock, pyarrow's allocator)
+            # deadlocks. The app does not use processes at all (see app.prefetch_sources).
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+        except (OSError, NotImplementedError):
+            pass
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def _row(source, status, download=None, parse=None, total=None, error=None):
+    return {
+        "Source": snapshot_cache.SOURCES[source]["label"],
+        "Status": status,
+        "Download (s)": download,
+        "Parse (s)": parse,
+        "Total (s)": total,
+        "Error": error,
+    }
+
+
+@profiling.timed()
+def refresh_all(sources=None, force_refresh=False, ttl=None, use_processes=True):
+    sources = list(snapshot_cache.SOURCES) if sources is None else sources
+    started = time.perf_counter()
+    rows = []
+
+    # Incremental sales keep their own store; everything else goes through the snapshot cache
+    incremental_sales = []
+    if sales_store.INGEST_MODE == "incremental":
+        incremental_sales = [s for s in sources if snapshot_cache.kind_of(s) == "sales"]
+    stale = {}
+    for source in sources:
+        if source in incremental_sales:
+            continue
+        meta = snapshot_cache.read_meta(source)
+        if force_refresh or not snapshot_cache.is_fresh(meta, ttl):
+            stale[source] = meta
+        else:
+            rows.append(_row(source, "cached", total=0.0))
+
+    # No worker processes when nothing needs parsing
+    with cpu_pool(use_processes and bool(stale), max(len(stale), 1)) as parse_pool, \
+            ThreadPoolExecutor(max_workers=max(len(stale) + len(incremental_sales), 1)) as io_pool:
+        sales_futures = {io_pool.submit(profiling.carry(_ingest_sales), source, force_refresh, ttl): source for source in incremental_sales}
+        downloads = {io_pool.submit(profiling.carry(_download), source, meta): source for source, meta in stale.items()}
+
+        parses = {}
+        for future in as_completed(downloads):
+            source = downloads[future]
+            try:
+                payload, validators, download_s = future.result()
+            except Exception as e:
+                snapshot_cache.mark_error(source, e)
+                status = "offline" if snapshot_cache.has_snapshot(source) else "failed"
+                rows.append(_row(source, status, total=time.perf_counter() - started, error=str(e)))
+                continue
+            if snapshot_cache.is_unchanged(stale[source], payload):
+                snapshot_cache.touch_snapshot(source, validators)
+                rows.append(_row(source, "unchanged", download_s, total=time.perf_counter() - started))
+                continue
+            # Parse as soon as this download lands, while the others are still downloading
+            # Threads carry this run's trace; a worker process cannot (see profiling.record below)
+            parse = _parse if isinstance(parse_pool, ProcessPoolExecutor) else profiling.carry(_parse)
+            parses[parse_pool.submit(parse, source, payload)] = (source, payload, validators, download_s)
+
+        for future in as_completed(parses):
+            source, payload, validators, download_s = parses[future]
+            try:
+                df, parse_s = future.result()
+                if isinstance(parse_pool, ProcessPoolExecutor):
+                    # Spans inside worker processes are lost; keep the time they measured
+                    profiling.record("parse", parse_s, source=source, process="worker")
+                snapshot_cache.write_snapshot(source, df, payload, validators)
+                rows.append(_row(source, "refreshed", download_s, parse_s, time.perf_counter() - started))
+            except Exception as e:
+                snapshot_cache.mark_error(source, e)
+                rows.append(_row(source, "failed", download_s, total=time.perf_counter() - started, error=str(e)))
+
+        for future, source in sales_futures.items():
+            try:
+                elapsed, status = future.result()
+                rows.append(_row(source, status, total=elapsed))
+            except Exception as e:
+                status = "offline" if sales_store.read_state(source) is not None else "failed"
+                rows.append(_row(source, status, total=time.perf_counter() - started, error=str(e)))
+
+    return pd.DataFrame(rows, columns=REPORT_COLUMNS)
@@ -0,0 +1,179 @@
+from concurrent.futures import as_completed
+
+import pandas as pd
+
+import anomalies
+import classify
+import outlets
+import parallel_loader
+import profiling
+import recipes
+import reconciliation
+import sales_rollup
+import sales_store
+import schema
+import snapshot_cache
+
+# Streamlit-free preprocessing shared by app.py and reconcile_cli.py.
+# Raw sheets in, normalised frames / monthly summaries out.
+
+
+@profiling.timed()
+def preprocess_data(stock):
+    if stock is None: return pd.DataFrame()
+    # Standardize columns
+    stock.columns = stock.columns.str.lower().str.strip()
+    
+    # Date conversion
+    if "inventory date :" in stock.columns:
+        stock["inventory date :"] = pd.to_datetime(stock["inventory date :"])
+        stock["month"] = stock["inventory date :"].dt.to_period("M")
+    
+    # Cup / lid type and size per item (classify.py)
+    if "item name :" in stock.columns:
+        stock = classify.tag_inventory(stock)
+
+    # Drop unused columns, categorical text, downcast quantities
+    return schema.apply_schema(stock, "stock")
+
+
+@profiling.timed()
+def get_stock_summary(stock):
+    if stock.empty: return pd.DataFrame()
+    # We need unique closing stock per item per month.
+    # Key columns for grouping - Group by Item Code and Month ONLY for uniqueness
+    group_cols = ["item code :", "month"]
+    
+    # Aggregation rules: Sum quantity, take first available description/category
+    agg_dict = {
+        "physical quantity :": "sum",
+        "item name :": "first",
+        "category :": "first",
+        "uom :": "first"
+    }
+    
+    # Filter agg_dict to only include columns present in df
+    agg_dict = {k: v for k, v in agg_dict.items() if k in stock.columns}
+    
+    # Aggregate
+    monthly_stock = stock.groupby(group_cols, observed=True).agg(agg_dict).reset_index()
+    monthly_stock.rename(columns={"physical quantity :": "closing_stock"}, inplace=True)
+    
+    return monthly_stock
+
+
+@profiling.timed()
+def preprocess_warehouse(warehouse):
+    if warehouse is None: return pd.DataFrame()
+    warehouse.columns = warehouse.columns.str.lower().str.strip()
+    if "issue date :" in warehouse.columns:
+        warehouse["issue date :"] = pd.to_datetime(warehouse["issue date :"])
+        warehouse["month"] = warehouse["issue date :"].dt.to_period("M")
+    return schema.apply_schema(warehouse, "warehouse")
+
+
+@profiling.timed()
+def get_warehouse_summary(warehouse):
+    if warehouse.empty: return pd.DataFrame()
+    # Group by Item Code and Month to get total issued quantity
+    group_cols = ["item code", "month"]
+    
+    # Aggregation: Sum issue quantity
+    agg_dict = {
+        "issue quantity :": "sum"
+    }
+    
+    # Filter agg_dict
+    agg_dict = {k: v for k, v in agg_dict.items() if k in warehouse.columns}
+    
+    warehouse_summary = warehouse.groupby(group_cols, observed=True).agg(agg_dict).reset_index()
+    warehouse_summary.rename(columns={"issue quantity :": "supplied_qty", "item code": "item code :"}, inplace=True)
+    
+    return warehouse_summary
+
+
+@profiling.timed()
+def preprocess_sales(sales):
+    if sales is None: return pd.DataFrame()
+    sales.columns = sales.columns.str.lower().str.strip()
+    # Check for date column variations
+    date_col = next((c for c in sales.columns if "date" in c), None)
+    if date_col:
+        sales["date"] = pd.to_datetime(sales[date_col])
+        sales["month"] = sales["date"].dt.to_period("M")
+    # Order channel + cup rule per row (classify.py)
+    sales = classify.tag_sales(sales, sales_rollup.find_item_col(sales))
+    return schema.apply_schema(sales, "sales")
+
+
+# --- Batch reports, one shard per outlet ---
+
+REPORT_NAMES = ["stock", "coffee_items", "coffee_summary", "syrup", "cups", "cup_skus", "top_leaks"]
+
+
+@profiling.timed()
+def load_outlet_sales(outlet, refresh=False, ttl=None):
+    source = outlets.source_for(outlet, "sales")
+    if sales_store.INGEST_MODE == "incremental":
+        return preprocess_sales(sales_store.read_all(source))
+    return preprocess_sales(snapshot_cache.load_source(source, ttl=ttl, force_refresh=refresh))
+
+
+def build_reports(outlet, refresh=False):
+    # One outlet, every month. Runs in a worker process; only reads snapshots / the sales store.
+    stock = preprocess_data(snapshot_cache.load_source(outlets.source_for(outlet, "stock")))
+    stock = outlets.for_outlet(stock, outlet, "stock")
+    warehouse_summary = None
+    try:
+        warehouse = preprocess_warehouse(snapshot_cache.load_source(outlets.source_for(outlet, "warehouse")))
+        warehouse_summary = get_warehouse_summary(outlets.for_outlet(warehouse, outlet, "warehouse"))
+    except Exception as e:
+        print(f"{outlets.label(outlet)}: warehouse data unavailable, supplies count as 0: {e}")
+    cube = reconciliation.build_cube(stock, get_stock_summary(stock), warehouse_summary)
+
+    expected = None
+    try:
+        rollup = sales_rollup.rollup_sales(load_outlet_sales(outlet, refresh))
+        expected = recipes.expected_consumption(recipes.compile_registry(recipes.load_registry()), rollup, by="month")
+    except Exception as e:
+        print(f"{outlets.label(outlet)}: sales data unavailable, recipe consumption counts as 0: {e}")
+
+    def of_kind(*kinds):
+        return None if expected is None else expected[expected["kind"].isin(kinds)]
+
+    coffee_items, coffee_summary = reconciliation.coffee_by_month(cube, of_kind("coffee"))
+    reports = {
+        "stock": cube.reset_index(),
+        "coffee_items": coffee_items,
+        "coffee_summary": coffee_summary,
+        "syrup": reconciliation.syrup_by_month(cube, of_kind("syrup")),
+        "cups": reconciliation.cups_by_month(cube, stock, of_kind("cup")),
+        "cup_skus": reconciliation.cup_skus_by_month(cube, stock, of_kind("cup", "lid")),
+    }
+    history = anomalies.item_history(cube, stock["month"].unique(), reports["syrup"], reports["cup_skus"])
+    reports["top_leaks"] = anomalies.top_leaks(anomalies.score(history))
+    return {name: df.assign(outlet=outlet)[["outlet"] + list(df.columns)] for name, df in reports.items()}
+
+
+def build_all_reports(outlet_keys=None, refresh=False, use_processes=True):
+    # Downloads for every outlet run concurrently first, then each outlet is reconciled
+    # in its own process and the shards are concatenated into one report per table.
+    keys = list(outlets.OUTLETS) if outlet_keys is None else outlet_keys
+    load_report = parallel_loader.refresh_all(sources=outlets.all_sources(keys), force_refresh=refresh, use_processes=use_processes)
+
+    shards, errors = {}, {}
+    with parallel_loader.cpu_pool(use_processes, max(len(keys), 1)) as pool:
+        futures = {pool.submit(build_reports, key, refresh): key for key in keys}
+        for future in as_completed(futures):
+            try:
+                shards[futures[future]] = future.result()
+            except Exception as e:
+                errors[futures[future]] = str(e)
+
+    # Keep the configured outlet order, whatever order the shards finished in
+    done = [key for key in keys if key in shards]
+    merged = {
+        name: pd.concat([shards[key][name] for key in done], ignore_index=True) if done else pd.DataFrame()
+        for name in REPORT_NAMES
+    }
+    return merged, load_report, errors
@@ -0,0 +1,219 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from functools import partial, wraps
+
+import pandas as pd
+
+# Timing spans for the hot paths: loaders, download / parse, preprocessing, summaries,
+# reconciliation and each page branch of app.main.
+#
+# app.main starts a trace for a script run when the debug toggle is on. The trace is a
+# context variable: every span (nested per thread) and memory snapshot goes into the trace
+# of the session whose run it happens in, never another session's. Threads a run hands
+# work to get its context through carry(); anything else (the background refresher) has
+# no trace and records nothing. Spans inside worker processes are not collected
+# (parallel_loader records their measured time instead).
+#
+# The app shows a trace in the "Debug timings" sidebar panel and exports it as Chrome
+# trace-event JSON (open in chrome://tracing or ui.perfetto.dev).
+
+# PROFILE_SPANS=0 turns recording off entirely
+ENABLED = os.environ.get("PROFILE_SPANS", "1") != "0"
+
+SPAN_COLUMNS = ["Span", "Start (ms)", "Duration (ms)", "Thread", "Details"]
+SUMMARY_COLUMNS = ["Name", "Calls", "Total (ms)", "Max (ms)"]
+MEMORY_COLUMNS = ["Frame", "Rows", "Columns", "Memory (MB)"]
+
+_lock = threading.Lock()
+_local = threading.local()
+_trace = contextvars.ContextVar("profiling_trace", default=None)
+
+
+def start_trace(label="", memory=False):
+    # memory: also take memory snapshots (memory_usage(deep=True) scans every string)
+    trace = {
+        "label": label,
+        "started_at": time.time(),
+        "origin": time.perf_counter(),
+        "memory_enabled": memory,
+        "spans": [],
+        "memory": [],
+    }
+    _trace.set(trace)
+    return trace
+
+
+def stop_trace():
+    # Nothing is recorded in this context until the next start_trace
+    _trace.set(None)
+
+
+def current_trace():
+    return _trace.get()
+
+
+def carry(fn):
+    # fn bound to a copy of the caller's context (its trace), for a thread pool submit
+    return partial(contextvars.copy_context().run, fn)
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def begin(name, **details):
+    # Open a span; pair with end() (or use span() / timed())
+    trace = _trace.get()
+    if not ENABLED or trace is None:
+        return None
+    stack = _stack()
+    entry = {
+        "name": name,
+        "start": time.perf_counter() - trace["origin"],
+        "seconds": None,
+        "depth": len(stack),
+        "thread": threading.current_thread().name,
+        "tid": threading.get_ident(),
+        "details": details,
+        "trace": trace,
+    }
+    stack.append(entry)
+    return entry
+
+
+def end(entry, error=None):
+    if entry is None:
+        return
+    trace = entry.pop("trace")
+    entry["seconds"] = time.perf_counter() - trace["origin"] - entry["start"]
+    if error is not None:
+        entry["details"]["error"] = str(error)
+    # Pop this span (and anything left open inside it)
+    stack = _stack()
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i] is entry:
+            del stack[i:]
+            break
+    with _lock:
+        trace["spans"].append(entry)
+
+
+class span:
+    # with profiling.span("syrup merge", month="2025-11"): ...
+    def __init__(self, name, **details):
+        self.name = name
+        self.details = details
+
+    def __enter__(self):
+        self.entry = begin(self.name, **self.details)
+        return self.entry
+
+    def __exit__(self, exc_type, exc, tb):
+        end(self.entry, exc)
+        return False
+
+
+def timed(name=None):
+    # Decorator: one span per call, named after the function unless given
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED or _trace.get() is None:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name, seconds, **details):
+    # A span measured elsewhere (e.g. a parse in a worker process), ending now
+    trace = _trace.get()
+    if not ENABLED or trace is None or seconds is None:
+        return
+    now = time.perf_counter() - trace["origin"]
+    entry = {
+        "name": name,
+        "start": now - seconds,
+        "seconds": seconds,
+        "depth": len(_stack()),
+        "thread": threading.current_thread().name,
+        "tid": threading.get_ident(),
+        "details": details,
+    }
+    with _lock:
+        trace["spans"].append(entry)
+
+
+def memory_snapshot(name, df):
+    trace = _trace.get()
+    if not ENABLED or trace is None or not trace["memory_enabled"] or not isinstance(df, pd.DataFrame):
+        return
+    entry = {
+        "name": name,
+        "at": time.perf_counter() - trace["origin"],
+        "rows": len(df),
+        "columns": df.shape[1],
+        "mb": df.memory_usage(deep=True).sum() / 1e6,
+    }
+    with _lock:
+        trace["memory"].append(entry)
+
+
+def _ordered(trace):
+    return sorted(trace["spans"], key=lambda s: (s["start"], -s["seconds"]))
+
+
+def spans_frame(trace):
+    rows = []
+    for s in _ordered(trace):
+        rows.append({
+            "Span": "· " * s["depth"] + s["name"],
+            "Start (ms)": 1000 * s["start"],
+            "Duration (ms)": 1000 * s["seconds"],
+            "Thread": s["thread"],
+            "Details": ", ".join(f"{k}={v}" for k, v in s["details"].items()),
+        })
+    return pd.DataFrame(rows, columns=SPAN_COLUMNS)
+
+
+def summary_frame(trace):
+    # Where the time went, by span name (nested spans are also counted in their parents)
+    spans = pd.DataFrame([{"Name": s["name"], "ms": 1000 * s["seconds"]} for s in trace["spans"]], columns=["Name", "ms"])
+    summary = spans.groupby("Name")["ms"].agg(["count", "sum", "max"]).reset_index()
+    summary.columns = SUMMARY_COLUMNS
+    return summary.sort_values("Total (ms)", ascending=False).reset_index(drop=True)
+
+
+def memory_frame(trace):
+    rows = [{"Frame": m["name"], "Rows": m["rows"], "Columns": m["columns"], "Memory (MB)": m["mb"]} for m in trace["memory"]]
+    return pd.DataFrame(rows, columns=MEMORY_COLUMNS)
+
+
+def to_chrome_trace(trace):
+    # Chrome trace-event format: complete events ("X") per span, counters ("C") per memory snapshot
+    pid = os.getpid()
+    events = []
+    for s in _ordered(trace):
+        events.append({
+            "name": s["name"], "cat": "app", "ph": "X", "pid": pid, "tid": s["tid"],
+            "ts": round(1e6 * s["start"], 1), "dur": round(1e6 * s["seconds"], 1),
+            "args": {k: str(v) for k, v in s["details"].items()},
+        })
+    for m in trace["memory"]:
+        events.append({
+            "name": "memory (MB)", "cat": "memory", "ph": "C", "pid": pid,
+            "ts": round(1e6 * m["at"], 1), "args": {m["name"]: round(m["mb"], 3)},
+        })
+    return json.dumps({
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"label": trace["label"], "started_at": trace["started_at"]},
+    }, indent=1)
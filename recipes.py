@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import profiling
+
+# Recipe registry: how much of each ingredient one unit of a beverage uses.
+#
+# recipes.csv columns:
+#   match     "item" (PetPooja item name) or "category" (PetPooja category)
+#   key       item name / category, matched case-insensitively
+#   ingredient, kind (syrup / coffee / cup / lid), qty, unit
+#             cups and lids are named by size ("Cup 250 ml", "Lid 90 mm") to match the
+#             classify.py inventory tags (see reconciliation.cup_skus_by_month)
+#   channel   "all", or "takeaway" for rules that skip Dine In orders (e.g. cups)
+#
+# The registry is compiled once into sparse (beverage x ingredient) matrices, one per
+# order channel, so expected consumption is a matrix-vector product over the quantities
+# in the sales rollup (see sales_rollup.py).
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.csv")
+
+CHANNELS = ["dine in", "takeaway"]
+
+
+def load_registry(path=REGISTRY_PATH):
+    registry = pd.read_csv(path)
+    registry["match"] = registry["match"].str.lower().str.strip()
+    registry["key"] = registry["key"].astype(str).str.lower().str.strip()
+    registry["channel"] = registry["channel"].fillna("all").str.lower().str.strip()
+    return registry
+
+
+def _matrix(rules, keys, ingredients):
+    rows = keys.get_indexer(rules["key"])
+    cols = ingredients.get_indexer(rules["ingredient"])
+    return sparse.csr_matrix(
+        (rules["qty"].to_numpy(dtype=float), (rows, cols)),
+        shape=(len(keys), len(ingredients)),
+    )
+
+
+def compile_registry(registry):
+    ingredients = registry.drop_duplicates("ingredient").set_index("ingredient")[["kind", "unit"]]
+    compiled = {"ingredients": ingredients}
+
+    for match in ["item", "category"]:
+        rules = registry[registry["match"] == match]
+        keys = pd.Index(rules["key"].unique())
+        compiled[f"{match}_keys"] = keys
+        compiled[f"{match}_matrix"] = {
+            channel: _matrix(rules[rules["channel"].isin(["all", channel])], keys, ingredients.index)
+            for channel in CHANNELS
+        }
+    return compiled
+
+
+def keys_for(compiled, kind, match="category", channel=None):
+    # e.g. every PetPooja category that consumes a cup (optionally only for one order channel)
+    ingredient_cols = np.flatnonzero(compiled["ingredients"]["kind"].to_numpy() == kind)
+    used = np.zeros(len(compiled[f"{match}_keys"]), dtype=bool)
+    for ch, matrix in compiled[f"{match}_matrix"].items():
+        if channel is not None and ch != channel:
+            continue
+        used |= np.asarray(matrix[:, ingredient_cols].sum(axis=1)).ravel() > 0
+    return list(compiled[f"{match}_keys"][used])
+
+
+def _quantities(keys, values, qty, groups, n_groups):
+    # Sum sold qty per (group, registry key) (unknown items/categories are dropped)
+    idx = keys.get_indexer(values)
+    known = idx >= 0
+    return sparse.csr_matrix((qty[known], (groups[known], idx[known])), shape=(n_groups, len(keys)))
+
+
+@profiling.timed()
+def expected_consumption(compiled, rollup, kind=None, by=None):
+    # rollup: sales_rollup.rollup_sales output (already aggregated per item/category/channel)
+    # by: optional rollup column (e.g. "month") -> one row per (by, ingredient) instead of totals
+    ingredients = compiled["ingredients"]
+    if by is None:
+        groups, labels = np.zeros(len(rollup), dtype=int), [None]
+    else:
+        groups, labels = pd.factorize(rollup[by], sort=True)
+    total = np.zeros((len(labels), len(ingredients)))
+
+    if not rollup.empty:
+        qty = rollup["qty"].to_numpy(dtype=float)
+        channel = rollup["channel"].to_numpy()
+        for ch in CHANNELS:
+            in_channel = channel == ch
+            for match, column in [("item", "item_name_clean"), ("category", "category_clean")]:
+                q = _quantities(compiled[f"{match}_keys"], rollup[column][in_channel], qty[in_channel], groups[in_channel], len(labels))
+                total += (q @ compiled[f"{match}_matrix"][ch]).toarray()
+
+    if by is None:
+        result = ingredients.assign(expected_qty=total[0]).reset_index()
+    else:
+        result = pd.DataFrame(total, index=pd.Index(labels, name=by), columns=ingredients.index)
+        result = result.stack().rename("expected_qty").reset_index().join(ingredients, on="ingredient")
+        result = result[[by, "ingredient", "kind", "unit", "expected_qty"]]
+    if kind is not None:
+        result = result[result["kind"] == kind].reset_index(drop=True)
+    return result
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+
+import outlets
+import pipeline
+import snapshot_cache
+
+# Headless batch reconciliation: every month in one run, no browser session needed.
+#
+#   python reconcile_cli.py --out reports --format both
+#
+# Writes stock.*, coffee_items.*, coffee_summary.*, syrup.*, cups.*, cup_skus.* (cups / lids per
+# size) and top_leaks.* (item months far outside their own history, see anomalies.py), every row
+# tagged with its outlet and month.
+# Uses the same snapshot cache, sales store and recipe registry as the app.
+# Outlets (outlets.json) are reconciled in parallel worker processes, --outlet limits the run.
+
+
+def write_reports(reports, out_dir, fmt="parquet", months=None):
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, df in reports.items():
+        df = df.copy()
+        if "month" in df.columns:
+            # Periods are not a Parquet/CSV type; "2025-11" strings round-trip everywhere
+            df["month"] = df["month"].astype(str)
+            if months:
+                df = df[df["month"].isin(months)]
+        if fmt in ("parquet", "both"):
+            path = os.path.join(out_dir, f"{name}.parquet")
+            snapshot_cache.arrow_safe(df).to_parquet(path, index=False)
+            written.append(path)
+        if fmt in ("csv", "both"):
+            path = os.path.join(out_dir, f"{name}.csv")
+            df.to_csv(path, index=False)
+            written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile stock, coffee, syrup and cups for every month.")
+    parser.add_argument("--out", default="reports", help="output folder (default: reports)")
+    parser.add_argument("--format", choices=["parquet", "csv", "both"], default="parquet")
+    parser.add_argument("--months", nargs="*", help="only write these months, e.g. 2025-11 2025-12")
+    parser.add_argument("--outlet", nargs="*", choices=list(outlets.OUTLETS), help="only these outlets (default: all)")
+    parser.add_argument("--refresh", action="store_true", help="check all sheets for changes now, ignoring the snapshot TTL")
+    parser.add_argument("--no-processes", action="store_true", help="run the outlet shards in threads")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        reports, load_report, errors = pipeline.build_all_reports(args.outlet or None, args.refresh, not args.no_processes)
+    except Exception as e:
+        print(f"Reconciliation failed: {e}")
+        return 1
+
+    print(load_report.to_string(index=False))
+    for outlet, error in errors.items():
+        print(f"  [FAILED] {outlets.label(outlet)}: {error}")
+
+    for path in write_reports(reports, args.out, args.format, args.months):
+        print(f"  wrote {path}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
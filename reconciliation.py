@@ -0,0 +1,178 @@
+import pandas as pd
+
+import classify
+import profiling
+import syrup_matching
+import syrup_names
+
+# Reconciliation cube: one row per (Item Code, month) holding every figure the pages need.
+# Built once per data snapshot; pages only slice it.
+
+CUBE_COLUMNS = [
+    "Item Name", "Category", "UOM",
+    "Opening Stock", "Supplied Qty", "Closing Stock", "Total Available", "Consumption",
+]
+
+
+def _wide(summary, value_col, months):
+    # item code x month matrix for one measure
+    if summary is None or summary.empty:
+        return pd.DataFrame(columns=months, dtype=float)
+    wide = summary.pivot_table(index="item code :", columns="month", values=value_col, aggfunc="sum", observed=True)
+    return wide.reindex(columns=months)
+
+
+@profiling.timed()
+def build_cube(stock, stock_summary, warehouse_summary):
+    if stock_summary.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS, index=pd.MultiIndex.from_tuples([], names=["Item Code", "month"]))
+
+    # Continuous month axis so "previous month" is always one column to the left
+    all_months = [stock_summary["month"]]
+    if warehouse_summary is not None and not warehouse_summary.empty:
+        all_months.append(warehouse_summary["month"])
+    all_months = pd.concat(all_months)
+    # One extra month so the last stock take still shows up as an opening balance
+    months = pd.period_range(all_months.min(), all_months.max() + 1, freq="M")
+
+    closing = _wide(stock_summary, "closing_stock", months)
+    supplied = _wide(warehouse_summary, "supplied_qty", months)
+    items = closing.index.union(supplied.index)
+    closing = closing.reindex(index=items)
+    supplied = supplied.reindex(index=items)
+    # Opening Stock = previous month's closing
+    opening = closing.shift(1, axis=1)
+
+    # Same item universe as before: anything with an opening, a supply or a closing that month
+    present = opening.notna() | supplied.notna() | closing.notna()
+
+    cube = pd.DataFrame({
+        "Opening Stock": opening.stack(future_stack=True),
+        "Supplied Qty": supplied.stack(future_stack=True),
+        "Closing Stock": closing.stack(future_stack=True),
+    })
+    cube = cube[present.stack(future_stack=True).to_numpy()].fillna(0)
+    cube.index.names = ["Item Code", "month"]
+
+    cube["Total Available"] = cube["Opening Stock"] + cube["Supplied Qty"]
+    cube["Consumption"] = cube["Total Available"] - cube["Closing Stock"]
+    # Negative consumption (data error or adjustment) is left as is, not clipped at 0
+
+    # Metadata Map - item names from stock data first (most reliable)
+    item_map = stock[["item code :", "item name :", "category :", "uom :"]].drop_duplicates("item code :").set_index("item code :")
+    item_map.columns = ["Item Name", "Category", "UOM"]
+    cube = cube.join(item_map, on="Item Code")
+
+    return cube[CUBE_COLUMNS].sort_index()
+
+
+@profiling.timed()
+def month_slice(cube, month):
+    # Equivalent of the old per-rerun master_df for one month
+    if month not in cube.index.get_level_values("month"):
+        return pd.DataFrame(columns=["Item Code"] + CUBE_COLUMNS)
+    return cube.xs(month, level="month").reset_index()
+
+
+# --- All-months reconciliations (same rules as the app pages, every month at once) ---
+# `expected` is recipes.expected_consumption(..., by="month") for the matching kind.
+
+def _expected_by_month(expected):
+    if expected is None or expected.empty:
+        return pd.Series(dtype=float)
+    return expected.groupby("month")["expected_qty"].sum()
+
+
+@profiling.timed()
+def coffee_by_month(cube, expected=None):
+    coffee = cube[cube["Category"].astype(str).str.contains("TEAS & COFFEES", case=False, na=False)]
+    summary = coffee.groupby(level="month").agg(**{
+        "Total Consumption": ("Consumption", "sum"),
+        "Avg Consumption per Item": ("Consumption", "mean"),
+    })
+    # Recipe grams -> Kg, like the Coffee page
+    summary["Expected from Sales (Kg)"] = _expected_by_month(expected).reindex(summary.index).fillna(0) / 1000.0
+    return coffee.reset_index(), summary.reset_index()
+
+
+@profiling.timed()
+def syrup_by_month(cube, expected=None):
+    syrup_inv = cube[cube["Category"].astype(str).str.contains("SYRUP", case=False, na=False)].reset_index()
+    if syrup_inv.empty:
+        return pd.DataFrame()
+    syrup_inv["Item Name"] = syrup_inv["Item Name"].astype(str)
+    syrup_inv["Bottle Size (ml)"] = syrup_names.bottle_size_ml(syrup_inv["Item Name"])
+    for col in ["Opening Stock", "Supplied Qty"]:
+        syrup_inv[f"{col} (L)"] = syrup_inv[col] * syrup_inv["Bottle Size (ml)"] / 1000.0
+    syrup_inv["Total Available (L)"] = syrup_inv["Opening Stock (L)"] + syrup_inv["Supplied Qty (L)"]
+
+    consumption = pd.DataFrame(columns=["month", "Item Name", "Consumption (L)"])
+    if expected is not None and not expected.empty:
+        # Recipe syrup -> inventory item (confirmed mappings, else the trigram index)
+        matches = syrup_matching.resolve(expected["ingredient"], syrup_matching.build_index(syrup_inv["Item Name"]))
+        consumption = expected.assign(
+            **{"Item Name": expected["ingredient"].map(syrup_matching.mapping(matches)),
+               "Consumption (L)": expected["expected_qty"] / 1000.0},
+        ).groupby(["month", "Item Name"], as_index=False)["Consumption (L)"].sum()
+
+    merged = syrup_inv.merge(consumption, on=["month", "Item Name"], how="left")
+    merged["Consumption (L)"] = merged["Consumption (L)"].fillna(0)
+    merged["Closing Stock (L)"] = merged["Total Available (L)"] - merged["Consumption (L)"]
+    merged = merged.rename(columns={"Item Name": "Syrup Name"})
+    return merged[["month", "Item Code", "Syrup Name", "Supplied Qty (L)", "Total Available (L)", "Consumption (L)", "Closing Stock (L)"]]
+
+
+@profiling.timed()
+def cups_by_month(cube, stock, expected=None):
+    # Every cup / lid inventory item (the Cup page default selection).
+    # stock: tagged stock frame (classify.tag_inventory), same tags as cup_skus_by_month
+    names = stock.loc[stock["cup_type"].notna(), "item name :"].astype(object).unique()
+    cups = cube[cube["Item Name"].astype(object).isin(names)]
+    summary = cups.groupby(level="month")[["Opening Stock", "Supplied Qty", "Closing Stock"]].sum()
+    summary["Total Available"] = summary["Opening Stock"] + summary["Supplied Qty"]
+    summary["Consumed (Sales)"] = _expected_by_month(expected).reindex(summary.index).fillna(0)
+    summary["Expected Closing Stock"] = summary["Total Available"] - summary["Consumed (Sales)"]
+    summary["Missing / Variance"] = summary["Expected Closing Stock"] - summary["Closing Stock"]
+    summary["Missing / Sales %"] = 100 * summary["Missing / Variance"] / summary["Consumed (Sales)"].where(summary["Consumed (Sales)"] > 0)
+    summary["Missing / Available %"] = 100 * summary["Missing / Variance"] / summary["Total Available"].where(summary["Total Available"] > 0)
+    return summary.reset_index()
+
+
+SKU_COLUMNS = [
+    "sku", "cup_type", "cup_size", "month",
+    "Opening Stock", "Supplied Qty", "Closing Stock", "Consumption", "Expected (Sales)", "Variance",
+]
+
+
+@profiling.timed()
+def cup_skus_by_month(cube, stock, expected=None):
+    # Expected vs actual per cup / lid size for every month at once.
+    # stock: tagged stock frame (classify.tag_inventory), expected: kinds "cup" and "lid", by="month"
+    tags = stock[["item name :", "cup_type", "cup_size"]].dropna(subset=["cup_type"]).astype(object)
+    tags = tags.drop_duplicates("item name :").rename(columns={"item name :": "Item Name"})
+    tags["cup_size"] = tags["cup_size"].fillna("unsized")
+
+    items = cube.reset_index()
+    items["Item Name"] = items["Item Name"].astype(object)
+    items = items.merge(tags, on="Item Name", how="inner")
+    actual = items.groupby(["cup_type", "cup_size", "month"])[["Opening Stock", "Supplied Qty", "Closing Stock", "Consumption"]].sum()
+
+    # No sales: expected = 0 (an empty series on the same index levels, so the join works)
+    sales = pd.Series(dtype=float, index=pd.MultiIndex.from_arrays([[], [], []], names=["cup_type", "cup_size", "month"]))
+    if expected is not None and not expected.empty:
+        sales = expected.assign(cup_type=expected["kind"], cup_size=classify.cup_size(expected["ingredient"]).fillna("unsized").to_numpy())
+        sales = sales.groupby(["cup_type", "cup_size", "month"])["expected_qty"].sum()
+
+    skus = actual.join(sales.rename("Expected (Sales)"), how="outer").fillna(0)
+    # Positive = more left the shelf than the sales explain (leak)
+    skus["Variance"] = skus["Consumption"] - skus["Expected (Sales)"]
+    skus = skus.reset_index()
+    skus["sku"] = skus["cup_type"] + " " + skus["cup_size"]
+    return skus[SKU_COLUMNS].sort_values(["cup_type", "cup_size", "month"]).reset_index(drop=True)
+
+
+def sku_matrix(skus, value="Variance"):
+    # SKU x month matrix of one measure (cup_skus_by_month output)
+    matrix = skus.pivot_table(index="sku", columns="month", values=value, aggfunc="sum").fillna(0)
+    matrix.columns = matrix.columns.astype(str)
+    return matrix
@@ -0,0 +1,58 @@
+import pandas as pd
+
+import classify
+import profiling
+
+# Pre-aggregated sales layer.
+# Invoice lines are collapsed to (month, item, category, order type) quantities before any
+# recipe lookup, so recipe deductions work on a few hundred rows instead of every sales line.
+
+ROLLUP_COLUMNS = ["month", "item_name_clean", "category_clean", "order_type", "channel", "cup_consuming", "item_name", "qty"]
+
+
+def find_qty_col(sales):
+    qty_col = next((c for c in sales.columns if c in ["qty.", "qty", "quantity"]), None)
+    # Fallback
+    if not qty_col:
+        qty_col = next((c for c in sales.columns if "qty" in c or "quantity" in c), None)
+    return qty_col
+
+
+def find_item_col(sales):
+    return next((c for c in sales.columns if "item" in c and "name" in c), None)
+
+
+@profiling.timed()
+def rollup_sales(sales, period="month"):
+    # period: time column kept in the rollup ("month", or "day" for the daily ledger)
+    if sales is None or sales.empty:
+        return pd.DataFrame(columns=[period] + ROLLUP_COLUMNS[1:])
+
+    qty_col = find_qty_col(sales)
+    if qty_col is None:
+        raise ValueError("Quantity column not found in sales data.")
+    item_col = find_item_col(sales)
+
+    keys = pd.DataFrame(index=sales.index)
+    if period in sales.columns:
+        keys[period] = sales[period]
+    keys["item_name_clean"] = sales[item_col].astype(str).str.lower().str.strip() if item_col else ""
+    keys["category_clean"] = sales["category"].astype(str).str.lower().str.strip() if "category" in sales.columns else ""
+    if "order type" in sales.columns:
+        keys["order_type"] = sales["order type"].astype(str).str.lower().str.strip()
+    else:
+        keys["order_type"] = ""
+    # Dine In vs everything else, tagged once in preprocess_sales (classify.py)
+    keys["channel"] = sales["channel"].astype(str) if "channel" in sales.columns else classify.channel(sales.get("order type", pd.Series("", index=sales.index))).astype(str)
+    if "cup_consuming" in sales.columns:
+        keys["cup_consuming"] = sales["cup_consuming"].astype(bool)
+
+    keys["item_name"] = sales[item_col] if item_col else ""
+    keys["qty"] = pd.to_numeric(sales[qty_col], errors="coerce").fillna(0)
+
+    group_cols = [c for c in [period] + ROLLUP_COLUMNS[1:] if c in keys.columns and c not in ["item_name", "qty"]]
+    rollup = keys.groupby(group_cols, as_index=False, dropna=False).agg(
+        item_name=("item_name", "first"),
+        qty=("qty", "sum"),
+    )
+    return rollup
@@ -0,0 +1,335 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+import data_sources
+import profiling
+import schema
+import snapshot_cache
+
+# Incremental, append-only store for the PetPooja sales rows.
+#
+# Layout (one folder per month):
+#   sales_store/2025-11/part-v<n>.parquet   closed days, appended (n: store version)
+#   sales_store/2025-12/tail-v<n>.parquet   latest (still open) day, replaced on every ingest
+#   sales_store/_state.json                 high-water mark, file list + bookkeeping
+#
+# Files are never rewritten in place. An ingest writes new files under new names, then
+# publishes them by replacing _state.json, whose "files" list is the store: readers open only
+# the files listed there, so they see the previous version or the new one, never a mix.
+# Files an ingest drops from the list are deleted by the next ingest, by when readers of the
+# older version have finished.
+#
+# The high-water mark is the last *closed* day. The newest day in the export can still
+# receive invoices, so it is kept in the tail file until a later day shows up.
+# Each closed day's rows are digested (_state.json day_digests); when a back-dated edit or
+# void in PetPooja changes one, that day's whole month is rewritten from the export.
+# An export that has not changed since the last ingest (not modified, or same byte hash)
+# is not read at all and leaves the store version as it was.
+
+# Every sales source (one per outlet, see outlets.py) has its own store:
+# "sales" -> sales_store/, "sales_<outlet>" -> sales_<outlet>_store/
+
+# "incremental" reads month partitions from the store, "full" re-reads the whole snapshot
+INGEST_MODE = os.environ.get("SALES_INGEST_MODE", "incremental")
+
+
+def store_dir(source="sales"):
+    return os.path.join(snapshot_cache.CACHE_DIR, f"{source}_store")
+
+
+def _state_path(source):
+    return os.path.join(store_dir(source), "_state.json")
+
+
+def read_state(source="sales"):
+    try:
+        with open(_state_path(source), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_state(source, state):
+    os.makedirs(store_dir(source), exist_ok=True)
+    tmp_path = _state_path(source) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, _state_path(source))
+
+
+def reset_store(source="sales"):
+    shutil.rmtree(store_dir(source), ignore_errors=True)
+
+
+def _row_day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value is None:
+        return None
+    parsed = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(parsed) else parsed.date()
+
+
+def _digest(digests, day, row):
+    # Per day: sha1 over its rows (in sheet order) and their count
+    entry = digests.setdefault(day.isoformat(), [hashlib.sha1(), 0])
+    entry[0].update(repr(row).encode())
+    entry[1] += 1
+
+
+def _finish(digests):
+    return {day: [h.hexdigest(), n] for day, (h, n) in digests.items()}
+
+
+def _read_rows(payload, sheet_name, wanted_day):
+    # Stream the sheet and only materialise the rows of days wanted_day(day) is true for.
+    # Every dated row is digested, so edits to days already stored can be detected.
+    wb = load_workbook(io.BytesIO(payload), read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return None, None, [], [], {}
+
+        header = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        # Same detection rule as preprocess_sales: first column whose name contains "date"
+        date_idx = next((i for i, h in enumerate(header) if "date" in h.lower().strip()), None)
+        if date_idx is None:
+            raise ValueError("No date column found in sales sheet")
+        # Column projection: only the columns the app uses are kept
+        wanted = schema.wants_column("sales")
+        keep = [i for i, h in enumerate(header) if wanted(h)]
+
+        new_rows, new_days, digests = [], [], {}
+        for row in rows:
+            if row is None or date_idx >= len(row):
+                continue
+            day = _row_day(row[date_idx])
+            if day is None:
+                continue
+            projected = [row[i] if i < len(row) else None for i in keep]
+            _digest(digests, day, projected)
+            if wanted_day(day):
+                new_rows.append(projected)
+                new_days.append(day)
+        return [header[i] for i in keep], header[date_idx], new_rows, new_days, _finish(digests)
+    finally:
+        wb.close()
+
+
+def _rows_from_frame(df, wanted_day):
+    # Same as _read_rows for a Parquet payload (data_sources parquet backend)
+    header = [str(h) for h in df.columns]
+    date_col = next((h for h in header if "date" in h.lower().strip()), None)
+    if date_col is None:
+        raise ValueError("No date column found in sales sheet")
+    wanted = schema.wants_column("sales")
+    keep = [h for h in header if wanted(h)]
+    days = pd.to_datetime(df[date_col], errors="coerce").dt.date
+    new_rows, new_days, digests = [], [], {}
+    for day, row in zip(days, df[keep].values.tolist()):
+        if pd.isna(day):
+            continue
+        _digest(digests, day, row)
+        if wanted_day(day):
+            new_rows.append(row)
+            new_days.append(day)
+    return keep, date_col, new_rows, new_days, _finish(digests)
+
+
+def _write_part(source, df, month, name):
+    # Returns the path relative to the store, as listed in _state.json "files"
+    folder = os.path.join(store_dir(source), month)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    table = pa.Table.from_pandas(snapshot_cache.arrow_safe(df), preserve_index=False)
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return f"{month}/{name}"
+
+
+def _listed_files(source, state):
+    # A store written before the file list existed: every Parquet file in its month folders
+    if state.get("files") is not None:
+        return list(state["files"])
+    pattern = os.path.join(store_dir(source), "????-??", "*.parquet")
+    return sorted(os.path.relpath(p, store_dir(source)).replace(os.sep, "/") for p in glob.glob(pattern))
+
+
+def _delete_files(source, files):
+    for name in files:
+        try:
+            os.remove(os.path.join(store_dir(source), name))
+        except FileNotFoundError:
+            pass
+
+
+@profiling.timed("sales ingest")
+def ingest(ttl=None, force_refresh=False, source="sales"):
+    state = read_state(source)
+    ttl = snapshot_cache.DEFAULT_TTL_SECONDS if ttl is None else ttl
+    if state is not None and not force_refresh and (time.time() - state["fetched_at"]) < ttl:
+        return state
+
+    try:
+        previous = state.get("validators") if state else None
+        payload, validators = snapshot_cache.fetch_payload(source, previous)
+    except Exception:
+        # Offline: the partitions we already have are still valid
+        if state is None:
+            raise
+        return state
+
+    if state is not None and (payload is None or snapshot_cache.content_hash(payload) == state.get("content_hash")):
+        state["fetched_at"] = time.time()
+        state["validators"] = validators or previous
+        _write_state(source, state)
+        return state
+
+    mark = date.fromisoformat(state["high_water_mark"]) if state and state["high_water_mark"] else None
+    sheet_name = snapshot_cache.SOURCES[source]["sheet_name"]
+    if data_sources.payload_format(source) == "parquet":
+        frame = pd.read_parquet(io.BytesIO(payload))
+        read = lambda wanted_day: _rows_from_frame(frame, wanted_day)
+    else:
+        read = lambda wanted_day: _read_rows(payload, sheet_name, wanted_day)
+    header, date_col, rows, days, digests = read(lambda day: mark is None or day > mark)
+
+    state = state or {"high_water_mark": None, "tail_path": None, "rows": 0, "version": 0}
+    state["fetched_at"] = time.time()
+    state["content_hash"] = snapshot_cache.content_hash(payload)
+    state["validators"] = validators
+    files = _listed_files(source, state)
+    retired = []
+    # New files are named after the version that publishes them, never an existing name
+    stamp = f"v{state['version'] + 1:06d}"
+    changed = False
+
+    # Back-dated corrections / voids: a stored (closed) day whose rows no longer digest the
+    # same. Its month is rebuilt from a second pass over the export. A store written before
+    # the digests existed may already have missed some, so all its closed months are rebuilt once.
+    # The months rebuilt by this ingest are kept in rebuilt_months (parallel_loader's load report).
+    state["rebuilt_months"] = []
+    if mark is not None:
+        stored = state.get("day_digests")
+        if stored is None:
+            closed_days = {day for day in digests if day <= mark.isoformat()}
+            dirty = sorted({day[:7] for day in closed_days} | {name[:7] for name in files})
+        else:
+            closed_days = {day for day in set(stored) | set(digests) if day <= mark.isoformat()}
+            dirty = sorted({day[:7] for day in closed_days if stored.get(day) != digests.get(day)})
+        if dirty:
+            files, dropped = _rebuild_months(source, read, header, dirty, mark, files, stamp)
+            retired += dropped
+            state["rebuilt_months"] = dirty
+            changed = True
+
+    # Every row of the open day can be voided: nothing after the mark is left, and neither is the tail
+    tails = [name for name in files if os.path.basename(name).startswith("tail")]
+    if not rows and tails:
+        files = [name for name in files if name not in tails]
+        retired += tails
+        state["tail_path"] = None
+        state["tail_rows"] = 0
+        changed = True
+
+    if rows:
+        new_df = pd.DataFrame(rows, columns=header)
+        day_series = pd.Series(days)
+        open_day = day_series.max()
+        months = pd.to_datetime(day_series).dt.strftime("%Y-%m")
+
+        # Closed days are appended as new parts, grouped by month
+        closed = (day_series < open_day).to_numpy()
+        for month in sorted(months[closed].unique()):
+            month_mask = closed & (months == month).to_numpy()
+            files.append(_write_part(source, new_df[month_mask], month, f"part-{stamp}.parquet"))
+        if closed.any():
+            state["high_water_mark"] = day_series[closed].max().isoformat()
+
+        # The open day replaces the previous tail (whose rows are now in the parts above)
+        files = [name for name in files if name not in tails]
+        retired += tails
+        state["tail_path"] = _write_part(source, new_df[~closed], open_day.strftime("%Y-%m"), f"tail-{stamp}.parquet")
+        files.append(state["tail_path"])
+        state["tail_rows"] = int((~closed).sum())
+        state["date_column"] = date_col
+        state["columns"] = header
+        changed = True
+
+    # Digests (and row counts) of the closed days, what the next ingest compares against
+    mark = state["high_water_mark"]
+    state["day_digests"] = {day: entry for day, entry in digests.items() if mark is not None and day <= mark}
+    state["rows"] = sum(n for _, n in state["day_digests"].values())
+    if changed:
+        state["version"] += 1
+    # Publish: one replace of _state.json switches readers to the new file list. Files the
+    # previous ingest dropped are only deleted now
+    previous_retired = state.get("retired", [])
+    state["files"] = sorted(files)
+    state["retired"] = sorted(set(retired))
+    _write_state(source, state)
+    _delete_files(source, [name for name in previous_retired if name not in state["files"]])
+    return state
+
+
+def _rebuild_months(source, read, header, months, mark, files, stamp):
+    # Rewrite the closed days of these months as one new part each; the tail is left alone.
+    # Returns the new file list and the parts it no longer lists
+    _, _, rows, days, _ = read(lambda day: day <= mark and day.strftime("%Y-%m") in months)
+    df = pd.DataFrame(rows, columns=header)
+    row_months = pd.Series([day.strftime("%Y-%m") for day in days], dtype=object)
+    dropped = [name for name in files if name[:7] in months and os.path.basename(name).startswith("part-")]
+    files = [name for name in files if name not in dropped]
+    for month in months:
+        mask = (row_months == month).to_numpy()
+        if mask.any():
+            files.append(_write_part(source, df[mask], month, f"part-{stamp}-rebuilt.parquet"))
+    return files, dropped
+
+
+def available_months(source="sales"):
+    return sorted({name[:7] for name in _listed_files(source, read_state(source) or {})})
+
+
+def _read_listed(source, wanted):
+    # Files listed in the current _state.json. Should an ingest publish and delete a file
+    # between reading the state and opening the file, read the newer version instead
+    for attempt in range(3):
+        state = read_state(source) or {}
+        files = [name for name in _listed_files(source, state) if wanted(name)]
+        try:
+            frames = [pq.read_table(os.path.join(store_dir(source), name)).to_pandas() for name in files]
+        except FileNotFoundError:
+            if attempt == 2:
+                raise
+            continue
+        if not frames:
+            return pd.DataFrame(columns=state.get("columns", []))
+        return pd.concat(frames, ignore_index=True)
+
+
+@profiling.timed("read sales month")
+def read_month(month, source="sales"):
+    # Only the partition files for the requested month are opened
+    return _read_listed(source, lambda name: name.startswith(f"{month}/"))
+
+
+@profiling.timed("read sales store")
+def read_all(source="sales"):
+    # Every month partition, for batch jobs (reconcile_cli.py), from one version of the store
+    return _read_listed(source, lambda name: True)
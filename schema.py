@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+import sales_rollup
+
+# Column layout the app actually uses, per source (names after lower().strip()).
+# Everything else is dropped right after parsing, repeated text becomes categorical and
+# quantities are downcast when that is lossless.
+
+SCHEMAS = {
+    "stock": {
+        "keep": ["inventory date :", "cost center :", "item code :", "item name :", "category :", "uom :", "physical quantity :", "month", "cup_type", "cup_size"],
+        "categorical": ["cost center :", "item code :", "item name :", "category :", "uom :", "cup_type", "cup_size"],
+        "numeric": ["physical quantity :"],
+    },
+    "warehouse": {
+        "keep": ["issue date :", "requesting cost center :", "item code", "item name :", "category :", "uom :", "issue quantity :", "month"],
+        "categorical": ["requesting cost center :", "item code", "item name :", "category :", "uom :"],
+        "numeric": ["issue quantity :"],
+    },
+    "sales": {
+        "keep": ["date", "month", "category", "order type", "channel", "cup_consuming"],
+        "categorical": ["category", "order type", "channel"],
+        "numeric": [],
+    },
+}
+
+
+def wants_column(source):
+    # Header predicate for column projection at read time (see excel_reader)
+    keep = set(SCHEMAS[source]["keep"])
+
+    def wanted(name):
+        name = str(name).lower().strip()
+        if name in keep:
+            return True
+        if source == "sales":
+            # Same detection rules as preprocess_sales / sales_rollup
+            return "date" in name or ("item" in name and "name" in name) or "qty" in name or "quantity" in name
+        return False
+    return wanted
+
+
+# source -> {"rows", "parsed_bytes", "after_bytes"}, filled by apply_schema. "Parsed" is the
+# frame as the reader returned it, already cut down to the wanted columns (projection happens
+# at parse time, possibly in a worker process), so "Saved %" is what the dtypes save on top
+MEMORY_REPORT = {}
+
+
+def _columns_for(df, source):
+    schema = SCHEMAS[source]
+    keep, categorical, numeric = list(schema["keep"]), list(schema["categorical"]), list(schema["numeric"])
+    if source == "sales":
+        # Item / qty column names vary between PetPooja exports
+        item_col, qty_col = sales_rollup.find_item_col(df), sales_rollup.find_qty_col(df)
+        if item_col:
+            keep.append(item_col)
+            categorical.append(item_col)
+        if qty_col:
+            keep.append(qty_col)
+            numeric.append(qty_col)
+    return keep, categorical, numeric
+
+
+def _downcast(col):
+    col = pd.to_numeric(col, errors="coerce")
+    if col.notna().all() and (col % 1 == 0).all():
+        return pd.to_numeric(col, downcast="integer")
+    as_float32 = col.astype("float32")
+    # Only go to float32 when no value changes (stock counts like 0.8 stay float64)
+    if ((as_float32.astype("float64") == col) | col.isna()).all():
+        return as_float32
+    return col
+
+
+def apply_schema(df, source):
+    parsed = int(df.memory_usage(deep=True).sum())
+    keep, categorical, numeric = _columns_for(df, source)
+
+    df = df[[c for c in df.columns if c in keep]].copy()
+    for col in categorical:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in numeric:
+        if col in df.columns:
+            df[col] = _downcast(df[col])
+
+    MEMORY_REPORT[source] = {
+        "rows": len(df),
+        "parsed_bytes": parsed,
+        "after_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+    return df
+
+
+def memory_report():
+    if not MEMORY_REPORT:
+        return pd.DataFrame(columns=["Source", "Rows", "Parsed (MB)", "After (MB)", "Saved %"])
+    report = pd.DataFrame.from_dict(MEMORY_REPORT, orient="index").rename_axis("Source").reset_index()
+    report["Parsed (MB)"] = report["parsed_bytes"] / 1e6
+    report["After (MB)"] = report["after_bytes"] / 1e6
+    report["Saved %"] = np.where(report["parsed_bytes"] > 0, 100 * (1 - report["after_bytes"] / report["parsed_bytes"]), 0.0)
+    return report.rename(columns={"rows": "Rows"})[["Source", "Rows", "Parsed (MB)", "After (MB)", "Saved %"]]
@@ -0,0 +1,270 @@
+import hashlib
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+import data_sources
+import excel_reader
+import profiling
+import schema
+
+# Local snapshot layer for the Google Sheets exports (or a local stand-in, see data_sources.py).
+# Each source is downloaded + parsed once, written as an uncompressed Arrow (Feather v2)
+# file next to a small JSON metadata file, and re-read memory-mapped on later runs.
+#
+# When a snapshot is older than the TTL the source is checked before anything is parsed:
+# a conditional request (ETag / Last-Modified) or the file's mtime + size, then the byte
+# hash of whatever was downloaded. An unchanged sheet only gets its fetched_at renewed,
+# so its snapshot and its fingerprint() (what the app's caches key on) stay the same.
+
+CACHE_DIR = os.environ.get(
+    "SNAPSHOT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".snapshot_cache"),
+)
+
+# How long a snapshot is considered fresh before we try to re-download it
+DEFAULT_TTL_SECONDS = int(os.environ.get("SNAPSHOT_TTL_SECONDS", 6 * 60 * 60))
+
+# Bump when parse_payload's output changes (e.g. schema.py keeps more columns), so
+# snapshots of unchanged sheets are still re-parsed once
+PARSER_VERSION = 2
+
+SOURCES = {
+    "stock": {
+        "label": "Stock Take",
+        "sheet_id": "1mKcRWrkCMHXOpofdjU1MrwRmhUGaaET8RUOG6eyHAqA",
+        "sheet_name": 0,
+    },
+    "warehouse": {
+        "label": "Warehouse Issues",
+        "sheet_id": "1Cy0A4nQvbaW8GYlqyuiLvob-qed5Lu-GugPNGjSaGF4",
+        "sheet_name": 0,
+    },
+    "sales": {
+        "label": "Sales Data",
+        "sheet_id": "1WOF03Jicq50xITuKeOvW2I8M-vApAlBSm5IQNLYOuFI",
+        "sheet_name": "MULLA HOUSE",
+    },
+}
+# Per-outlet sheets are added to SOURCES by outlets.py as "<kind>_<outlet>"
+# with a "kind" entry (stock / warehouse / sales) saying how to parse them.
+
+
+def kind_of(source):
+    return SOURCES[source].get("kind", source)
+
+
+def export_url(sheet_id):
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
+
+
+def _data_path(source):
+    return os.path.join(CACHE_DIR, f"{source}.arrow")
+
+
+def _meta_path(source):
+    return os.path.join(CACHE_DIR, f"{source}.json")
+
+
+def read_meta(source):
+    try:
+        with open(_meta_path(source), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(source, meta):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _meta_path(source) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp_path, _meta_path(source))
+
+
+def is_fresh(meta, ttl=None):
+    if meta is None or not os.path.exists(_data_path(meta["source"])):
+        return False
+    ttl = DEFAULT_TTL_SECONDS if ttl is None else ttl
+    return (time.time() - meta["fetched_at"]) < ttl
+
+
+def arrow_safe(df):
+    # Excel columns often mix numbers and text (e.g. codes, remarks).
+    # Arrow needs one type per column, so fall back to strings for those.
+    df = df.copy()
+    df.columns = df.columns.map(str)
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def download(url, timeout=60, previous=None):
+    return data_sources.http_get(url, previous, timeout)
+
+
+@profiling.timed("download")
+def fetch_payload(source, previous=None):
+    # (raw bytes, validators) of the sheet from the configured backend (data_sources.py).
+    # previous: validators of the last download; bytes are None if the backend says unchanged
+    spec = data_sources.spec_for(source)
+    if spec["backend"] == "google":
+        return download(export_url(SOURCES[source]["sheet_id"]), previous=previous)
+    return data_sources.fetch(spec, previous)
+
+
+def content_hash(payload):
+    return hashlib.sha256(payload).hexdigest()
+
+
+def is_unchanged(meta, payload):
+    # payload: bytes from fetch_payload (None = not modified)
+    if meta is None or meta.get("parser_version") != PARSER_VERSION or not os.path.exists(_data_path(meta["source"])):
+        return False
+    return payload is None or content_hash(payload) == meta["content_hash"]
+
+
+def previous_validators(meta):
+    # What a conditional fetch sends; a snapshot from an older parser is re-parsed anyway
+    return meta.get("validators") if is_unchanged(meta, None) else None
+
+
+def fingerprint(source):
+    # Changes only when the snapshot's content does
+    meta = read_meta(source)
+    return None if meta is None else meta["content_hash"]
+
+
+@profiling.timed("parse")
+def parse_payload(source, payload):
+    # Pure function (bytes -> DataFrame) so it can also run in a worker process.
+    # Only the columns the app uses are read (schema.wants_column).
+    wanted = schema.wants_column(kind_of(source))
+    if data_sources.payload_format(source) == "parquet":
+        parsed = pd.read_parquet(io.BytesIO(payload))
+        parsed = parsed[[c for c in parsed.columns if wanted(c)]]
+    else:
+        parsed = excel_reader.read_excel(payload, SOURCES[source]["sheet_name"], columns=wanted)
+    return arrow_safe(parsed)
+
+
+def _sheet_header(source, payload):
+    # Every column of the sheet, before projection (only the header row is read)
+    if data_sources.payload_format(source) == "parquet":
+        names = pq.read_schema(io.BytesIO(payload)).names
+        return [n for n in names if not n.startswith("__index_level_")]
+    return excel_reader.read_header(payload, SOURCES[source]["sheet_name"])
+
+
+@profiling.timed("write snapshot")
+def write_snapshot(source, df, payload, validators=None):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Write to a temp file first so a crash never leaves a half written snapshot
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _data_path(source) + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, _data_path(source))
+
+    meta = {
+        "source": source,
+        "label": SOURCES[source]["label"],
+        "origin": data_sources.describe(source),
+        "content_hash": content_hash(payload),
+        "parser_version": PARSER_VERSION,
+        "validators": validators,
+        "fetched_at": time.time(),
+        "changed_at": time.time(),
+        "rows": table.num_rows,
+        # The snapshot keeps only schema.wants_column's columns; the diagnostics list the sheet's
+        "sheet_columns": _sheet_header(source, payload),
+        "last_error": None,
+    }
+    _write_meta(source, meta)
+    return meta
+
+
+def touch_snapshot(source, validators=None):
+    # Source checked and unchanged: the snapshot is fresh again, nothing is re-parsed
+    meta = read_meta(source)
+    meta["fetched_at"] = time.time()
+    meta["validators"] = validators or meta.get("validators")
+    meta["last_error"] = None
+    _write_meta(source, meta)
+    return meta
+
+
+def mark_error(source, error):
+    # Keep the old snapshot but remember that the last refresh failed
+    meta = read_meta(source)
+    if meta is not None:
+        meta["last_error"] = str(error)
+        _write_meta(source, meta)
+
+
+def has_snapshot(source):
+    return read_meta(source) is not None and os.path.exists(_data_path(source))
+
+
+def refresh_snapshot(source):
+    # (meta, changed): the sheet is only parsed when its content changed
+    meta = read_meta(source)
+    payload, validators = fetch_payload(source, previous_validators(meta))
+    if is_unchanged(meta, payload):
+        return touch_snapshot(source, validators), False
+    return write_snapshot(source, parse_payload(source, payload), payload, validators), True
+
+
+@profiling.timed("read snapshot")
+def read_snapshot(source):
+    table = feather.read_table(_data_path(source), memory_map=True)
+    return table.to_pandas()
+
+
+def load_source(source, ttl=None, force_refresh=False):
+    meta = read_meta(source)
+    if not force_refresh and is_fresh(meta, ttl):
+        return read_snapshot(source)
+
+    try:
+        refresh_snapshot(source)
+    except Exception as e:
+        # Offline / export failed: keep serving the last snapshot if we have one
+        if not has_snapshot(source):
+            raise
+        mark_error(source, e)
+    return read_snapshot(source)
+
+
+def sheet_columns(source):
+    # Column names of the sheet itself, from the snapshot metadata (load_source first)
+    meta = read_meta(source)
+    return None if meta is None else meta.get("sheet_columns")
+
+
+def describe_snapshot(source):
+    meta = read_meta(source)
+    if meta is None:
+        return f"{SOURCES[source]['label']}: no snapshot"
+    fetched = datetime.fromtimestamp(meta["fetched_at"]).strftime("%Y-%m-%d %H:%M")
+    text = f"{meta['label']}: {meta['rows']:,} rows, fetched {fetched}"
+    changed = datetime.fromtimestamp(meta.get("changed_at", meta["fetched_at"])).strftime("%Y-%m-%d %H:%M")
+    if changed != fetched:
+        text += f", unchanged since {changed}"
+    if meta.get("origin", "google") != "google":
+        text += f" ({meta['origin'].split(':')[0]})"
+    if meta.get("last_error"):
+        text += " (offline, using last snapshot)"
+    return text
@@ -0,0 +1,166 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import syrup_names
+
+# Approximate matching of recipe syrups (recipes.csv ingredients) to inventory item names.
+#
+# Inventory names are turned into character trigram vectors once (build_index); each recipe
+# ingredient is scored against all of them with one sparse product (cosine similarity) and
+# resolved to the best candidate. Mappings someone has confirmed are kept in
+# syrup_mappings.json and win over the index, so later runs are a dictionary lookup.
+#
+#   python syrup_matching.py            report unmatched / low-confidence pairs
+#   python syrup_matching.py --accept   also store every confident match as confirmed
+
+MAPPINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "syrup_mappings.json")
+
+# Best candidates scoring below this are reported but not used
+MIN_SCORE = 0.6
+
+NGRAM = 3
+
+RESOLVED_COLUMNS = ["ingredient", "inventory_name", "score", "status"]
+
+
+def _ngrams(text):
+    padded = f" {text} "
+    return [padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)]
+
+
+def _vectors(texts, vocab, grow):
+    rows, cols, norms = [], [], []
+    for row, text in enumerate(texts):
+        grams = _ngrams(text)
+        # Norm over every gram, so grams the index has never seen still lower the score
+        norms.append(np.sqrt(len(grams)) or 1.0)
+        for gram in grams:
+            col = vocab.setdefault(gram, len(vocab)) if grow else vocab.get(gram)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(texts), len(vocab)))
+    # Duplicate grams were summed; use presence only
+    matrix.data[:] = 1.0
+    return sparse.diags(1.0 / np.asarray(norms)) @ matrix
+
+
+def build_index(inventory_names):
+    names = pd.Index(pd.Series(inventory_names, dtype=object).dropna().astype(str).unique())
+    vocab = {}
+    matrix = _vectors(syrup_names.match_text(names), vocab, grow=True)
+    return {"names": names, "vocab": vocab, "matrix": matrix.tocsr()}
+
+
+def best_matches(index, queries):
+    queries = pd.Series(queries, dtype=object).astype(str)
+    if len(index["names"]) == 0 or queries.empty:
+        return pd.DataFrame({"ingredient": queries, "inventory_name": None, "score": 0.0})
+    q = _vectors(syrup_names.match_text(queries), index["vocab"], grow=False)
+    q = sparse.csr_matrix(q, shape=(len(queries), index["matrix"].shape[1]))
+    scores = (q @ index["matrix"].T).toarray()
+    best = scores.argmax(axis=1)
+    return pd.DataFrame({
+        "ingredient": queries.to_numpy(),
+        "inventory_name": index["names"][best],
+        "score": scores[np.arange(len(queries)), best],
+    })
+
+
+def load_mappings(path=MAPPINGS_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def mappings_version(path=MAPPINGS_PATH):
+    # Content hash of the confirmed mappings, for caches of resolved matches (app.py)
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def save_mappings(mappings, path=MAPPINGS_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(mappings.items())), f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def resolve(ingredients, index, mappings=None, min_score=MIN_SCORE):
+    # status: confirmed (syrup_mappings.json), matched, low confidence, unmatched
+    mappings = load_mappings() if mappings is None else mappings
+    ingredients = pd.Series(pd.unique(pd.Series(ingredients, dtype=object).dropna().astype(str)), dtype=object)
+
+    # Confirmed mappings only count while the inventory item still exists
+    confirmed = ingredients.map(mappings)
+    confirmed = confirmed.where(confirmed.isin(index["names"]))
+    resolved = best_matches(index, ingredients[confirmed.isna()])
+
+    resolved["status"] = np.where(resolved["score"] >= min_score, "matched",
+                                  np.where(resolved["score"] > 0, "low confidence", "unmatched"))
+    resolved.loc[resolved["status"] == "unmatched", "inventory_name"] = None
+    known = pd.DataFrame({
+        "ingredient": ingredients[confirmed.notna()],
+        "inventory_name": confirmed.dropna(),
+        "score": 1.0,
+        "status": "confirmed",
+    })
+    resolved = pd.concat([known, resolved], ignore_index=True)
+    return resolved[RESOLVED_COLUMNS].sort_values("ingredient").reset_index(drop=True)
+
+
+def mapping(resolved):
+    # ingredient -> inventory item name, for the pairs that are safe to use
+    used = resolved[resolved["status"].isin(["confirmed", "matched"])]
+    return dict(zip(used["ingredient"], used["inventory_name"]))
+
+
+def review(resolved):
+    # Pairs someone should look at (and confirm in syrup_mappings.json)
+    return resolved[resolved["status"].isin(["low confidence", "unmatched"])].reset_index(drop=True)
+
+
+def confirm(resolved, path=MAPPINGS_PATH):
+    mappings = load_mappings(path)
+    mappings.update(mapping(resolved))
+    save_mappings(mappings, path)
+    return mappings
+
+
+def main(argv=None):
+    # Imported here because pipeline -> reconciliation imports this module
+    import recipes
+    import snapshot_cache
+    from pipeline import preprocess_data
+
+    parser = argparse.ArgumentParser(description="Match recipe syrups to inventory items.")
+    parser.add_argument("--accept", action="store_true", help="store every confident match in syrup_mappings.json")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    args = parser.parse_args(argv)
+
+    stock = preprocess_data(snapshot_cache.load_source("stock"))
+    inventory = stock.loc[stock["category :"].astype(str).str.contains("SYRUP", case=False, na=False), "item name :"]
+    registry = recipes.load_registry()
+    resolved = resolve(registry.loc[registry["kind"] == "syrup", "ingredient"], build_index(inventory), min_score=args.min_score)
+
+    print(resolved.to_string(index=False))
+    to_review = review(resolved)
+    print(f"\n{len(to_review)} recipe syrup(s) need review" if len(to_review) else "\nEvery recipe syrup is matched")
+    if args.accept:
+        confirm(resolved)
+        print(f"Saved confirmed mappings to {MAPPINGS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
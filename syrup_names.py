@@ -0,0 +1,91 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Vectorized name normalization for syrups.
+# Inventory/recipe columns repeat the same few dozen names, so every rule below runs on
+# the unique names only (and remembers them across calls), then maps back to the column.
+
+_PARENS = re.compile(r"\(.*?\)")
+# Pack sizes like "700 ML", "1LTR", "1 KG", "200ML"
+_SIZES = re.compile(r"\b\d+(\.\d+)?\s*(ML|LTR|LT|L|KG|GMS|GM|G)\b")
+
+# Words stripped (in this order) by the notebook reconciliation match key
+MATCH_KEY_NOISE = ["monin", "syrup", "700ml", "1ltr", "bottle", " ", "-"]
+
+_cache = {}
+
+
+def _per_unique(names, rule_name, rule):
+    # Run `rule` (Series -> Series) once per unseen unique name and broadcast back
+    names = pd.Series(names)
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    memo = _cache.setdefault(rule_name, {})
+
+    missing = [u for u in uniques if u not in memo]
+    if missing:
+        memo.update(zip(missing, rule(pd.Series(missing, dtype=object))))
+
+    values = np.array([memo[u] for u in uniques], dtype=object)
+    return pd.Series(values[codes], index=names.index)
+
+
+def _bottle_size_rule(names):
+    upper = names.map(str).str.upper()
+    return pd.Series(np.select(
+        [
+            upper.str.contains("1 LTR", regex=False) | upper.str.contains("1LTR", regex=False),
+            upper.str.contains("700", regex=False),
+            upper.str.contains("250", regex=False),
+        ],
+        [1000.0, 700.0, 250.0],
+        default=700.0,
+    ))
+
+
+def _match_key_rule(names):
+    key = names.where(names.map(lambda v: isinstance(v, str)), "").astype(str).str.lower()
+    for word in MATCH_KEY_NOISE:
+        key = key.str.replace(word, "", regex=False)
+    return key
+
+
+def _match_text_rule(names):
+    text = names.map(str).str.upper().str.replace(_PARENS, " ", regex=True).str.replace(_SIZES, " ", regex=True)
+    for word in ["MONIN", "SYRUP"]:
+        text = text.str.replace(rf"\b{word}\b", " ", regex=True)
+    return text.str.replace(r"[^A-Z0-9]+", " ", regex=True).str.strip()
+
+
+def _litres_per_bottle_rule(names):
+    lower = names.map(str).str.lower()
+    return pd.Series(np.select(
+        [
+            lower.str.contains("1ltr", regex=False) | lower.str.contains("1000ml", regex=False),
+            lower.str.contains("250ml", regex=False),
+        ],
+        [1.0, 0.25],
+        default=0.7,
+    ))
+
+
+def bottle_size_ml(names):
+    # "1 LTR"/"1LTR" -> 1000, "700" -> 700, "250" -> 250, otherwise a 700 ml Monin bottle
+    return _per_unique(names, "bottle_size_ml", _bottle_size_rule).astype(float)
+
+
+def match_key(names):
+    # Notebook rule (normalize_name): lower case, drop brand/size words, spaces and dashes
+    return _per_unique(names, "match_key", _match_key_rule).astype(str)
+
+
+def match_text(names):
+    # Fuzzy matching rule (syrup_matching): brand, "syrup", pack sizes and punctuation removed,
+    # words kept apart -> "MONIN PEACH SYRUP 700 ML" -> "PEACH", "WILD HONEY 200ML" -> "WILD HONEY"
+    return _per_unique(names, "match_text", _match_text_rule).astype(str)
+
+
+def litres_per_bottle(names):
+    # Notebook rule (get_conversion_factor): litres in one stock unit
+    return _per_unique(names, "litres_per_bottle", _litres_per_bottle_rule).astype(float)
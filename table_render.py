@@ -0,0 +1,117 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Rendering for the large page tables: one page of rows at a time, number formats and
+# colour scales as st.column_config instead of pandas Styler.
+#
+# Styler.format / background_gradient build a CSS string per cell on every rerun and ship
+# the whole styled frame. Here the browser formats the numbers, and a colour scale is a
+# ProgressColumn (a bar per cell) whose range comes from the whole table, so bars compare
+# across pages. Only the current page is sent.
+#
+# Page slices (sorted, then cut) are kept per (table, filter state, sort, page), least
+# recently used evicted first, so reruns for unrelated widgets and paging back reuse them.
+# `state` must change whenever the rows can: callers pass derived_cache keys plus the
+# filter values. Without a state nothing is cached.
+
+PAGE_SIZE = int(os.environ.get("TABLE_PAGE_SIZE", 100))
+MAX_SLICES = int(os.environ.get("TABLE_SLICE_CACHE", 256))
+
+_lock = threading.Lock()
+_slices = OrderedDict()  # (key, state, sort, descending, page, page_size) -> frame
+_stats = {"hits": 0, "misses": 0}
+
+
+def page_count(rows, page_size=PAGE_SIZE):
+    return max(1, -(-rows // page_size))
+
+
+def page_slice(df, page, page_size=PAGE_SIZE, sort_by=None, descending=False, key=None, state=None):
+    # Rows of one page (1-based) after sorting the whole table by `sort_by`
+    cache_key = None if state is None else (key, state, sort_by, descending, page, page_size)
+    if cache_key is not None:
+        with _lock:
+            hit = _slices.get(cache_key)
+            if hit is not None:
+                _slices.move_to_end(cache_key)
+                _stats["hits"] += 1
+                return hit
+
+    # Row positions in sort order (sort_values rules: stable, missing values last). take()
+    # copies only the page's rows, data and index, so a cached page does not keep a
+    # sorted copy of the whole table alive
+    if sort_by:
+        order = df[sort_by].reset_index(drop=True).sort_values(ascending=not descending, kind="stable").index.to_numpy()
+    else:
+        order = np.arange(len(df))
+    part = df.take(order[(page - 1) * page_size:page * page_size])
+
+    if cache_key is not None:
+        with _lock:
+            _stats["misses"] += 1
+            _slices[cache_key] = part
+            while len(_slices) > MAX_SLICES:
+                _slices.popitem(last=False)
+    return part
+
+
+def column_config(df, formats=None, scales=None):
+    # formats: {column: printf format, e.g. "%,.2f"}; scales: {column: bar colour}
+    # ("red", "blue", "auto", "auto-inverse", ...), drawn over the column's full range
+    formats = formats or {}
+    config = {}
+    for column, fmt in formats.items():
+        if column in df.columns and column not in (scales or {}):
+            config[column] = st.column_config.NumberColumn(format=fmt)
+    for column, color in (scales or {}).items():
+        if column not in df.columns:
+            continue
+        values = pd.to_numeric(df[column], errors="coerce")
+        low, high = values.min(), values.max()
+        if pd.isna(low):
+            config[column] = st.column_config.NumberColumn(format=formats.get(column))
+            continue
+        if high == low:
+            high = low + 1
+        config[column] = st.column_config.ProgressColumn(
+            format=formats.get(column, "%,.2f"), min_value=float(low), max_value=float(high), color=color,
+        )
+    return config
+
+
+def render(df, key, state=None, formats=None, scales=None, page_size=PAGE_SIZE, **dataframe_args):
+    # st.dataframe with paging controls when the table has more than one page.
+    # Sorting by a header click only sorts the visible page, so a paged table gets a
+    # "Sort by" control that sorts the whole table before it is cut.
+    pages = page_count(len(df), page_size)
+    sort_by, descending, page = None, False, 1
+    if pages > 1:
+        col1, col2, col3 = st.columns([2, 1, 1])
+        sort_by = col1.selectbox("Sort by", [None] + list(df.columns), format_func=lambda c: "As listed" if c is None else c, key=f"{key}_sort")
+        descending = col2.checkbox("Descending", key=f"{key}_descending", disabled=sort_by is None)
+        # No max_value: a narrower filter can leave the stored page past the end
+        page = min(int(col3.number_input(f"Page (of {pages})", min_value=1, value=1, step=1, key=f"{key}_page")), pages)
+
+    part = page_slice(df, page, page_size, sort_by, descending, key, state)
+    if pages > 1:
+        first = (page - 1) * page_size + 1
+        st.caption(f"Rows {first:,}–{first + len(part) - 1:,} of {len(df):,}")
+    dataframe_args.setdefault("use_container_width", True)
+    st.dataframe(part, column_config=column_config(df, formats, scales), **dataframe_args)
+    return part
+
+
+def cache_info():
+    with _lock:
+        return {"slices": len(_slices), **_stats}
+
+
+def clear():
+    with _lock:
+        _slices.clear()
+        _stats.update(hits=0, misses=0)
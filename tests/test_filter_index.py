@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classify
+import filter_index
+
+
+def test_build_after_outlet_filter():
+    # One outlet's rows out of a shared sheet: labels are not 0..n-1 and run past len()
+    stock = pd.DataFrame({
+        "item name :": ["PAPER CUP (250 ML)", "MONIN VANILLA SYRUP 700 ML", "COFFEE BEANS", "NAPKINS"],
+        "category :": ["CUPS", "SYRUPS", "TEAS & COFFEES", None],
+        "month": pd.Period("2025-11", freq="M"),
+    }, index=[7, 12, 30, 41])
+    index = filter_index.build(classify.tag_inventory(stock))
+
+    assert index["classes"]["cup"] == ["PAPER CUP (250 ML)"]
+    assert index["classes"]["syrup"] == ["MONIN VANILLA SYRUP 700 ML"]
+    assert index["classes"]["coffee"] == ["COFFEE BEANS"]
+    assert index["items_by_category"] == {
+        "CUPS": ["PAPER CUP (250 ML)"],
+        "SYRUPS": ["MONIN VANILLA SYRUP 700 ML"],
+        "TEAS & COFFEES": ["COFFEE BEANS"],
+    }
+    assert index["all_items"] == sorted(stock["item name :"])
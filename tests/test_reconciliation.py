@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import classify
+import reconciliation
+
+
+def _stock():
+    stock = pd.DataFrame({
+        "item code :": ["C1", "L1", "B1", "P1"],
+        # The plate has "LID" in its name but is not a cup or lid (no cup_type tag)
+        "item name :": ["PAPER CUP (250 ML)", "CUP LIDS (90 MM)", "COFFEE BEANS", "PLATE WITH LID"],
+        "category :": ["CUPS", "CUPS", "TEAS & COFFEES", "PACKAGING"],
+        "uom :": ["PCS", "PCS", "KG", "PCS"],
+    })
+    return classify.tag_inventory(stock)
+
+
+def _cube(stock):
+    months = [pd.Period("2025-11", freq="M"), pd.Period("2025-12", freq="M")]
+    index = pd.MultiIndex.from_product([list(stock["item code :"]), months], names=["Item Code", "month"])
+    cube = pd.DataFrame({"Opening Stock": 100.0, "Supplied Qty": 50.0, "Closing Stock": 120.0}, index=index)
+    cube["Total Available"] = cube["Opening Stock"] + cube["Supplied Qty"]
+    cube["Consumption"] = cube["Total Available"] - cube["Closing Stock"]
+    names = stock.set_index("item code :")[["item name :", "category :", "uom :"]]
+    names.columns = ["Item Name", "Category", "UOM"]
+    return cube.join(names, on="Item Code")[reconciliation.CUBE_COLUMNS]
+
+
+def test_cup_skus_without_sales_expects_zero():
+    stock = _stock()
+    for expected in (None, pd.DataFrame(columns=["kind", "ingredient", "month", "expected_qty"])):
+        skus = reconciliation.cup_skus_by_month(_cube(stock), stock, expected)
+        assert len(skus) == 4
+        assert (skus["Expected (Sales)"] == 0).all()
+        assert (skus["Variance"] == skus["Consumption"]).all()
+
+
+def test_cups_by_month_counts_tagged_items_only():
+    stock = _stock()
+    assert stock.loc[stock["item name :"] == "PLATE WITH LID", "cup_type"].isna().all()
+    cups = reconciliation.cups_by_month(_cube(stock), stock)
+    # The cup and the lid, 100 each; the plate (matched by a "CUP|LID" name search) is left out
+    assert list(cups["Opening Stock"]) == [200.0, 200.0]
+    assert (cups["Consumed (Sales)"] == 0).all()
@@ -0,0 +1,117 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_sources
+import sales_store
+import snapshot_cache
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    # The sales export served to ingest: export["rows"] = [(day, item, qty), ...]
+    current = {"rows": []}
+
+    def fetch_payload(source, previous=None):
+        df = pd.DataFrame(current["rows"], columns=["Date", "Item Name", "Qty."])
+        df["Date"] = pd.to_datetime(df["Date"])
+        df["Category"] = "COFFEE"
+        df["Order Type"] = "Dine In"
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue(), None
+
+    monkeypatch.setattr(snapshot_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(snapshot_cache, "fetch_payload", fetch_payload)
+    monkeypatch.setattr(data_sources, "payload_format", lambda source: "parquet")
+    return current
+
+
+def _ingest():
+    return sales_store.ingest(force_refresh=True)
+
+
+def _quantity(month=None):
+    df = sales_store.read_all() if month is None else sales_store.read_month(month)
+    return float(df["Qty."].sum()) if len(df) else 0.0
+
+
+def test_reads_only_published_files(export):
+    export["rows"] = [("2025-11-01", "LATTE", 1), ("2025-11-02", "LATTE", 2)]
+    state = _ingest()
+    assert state["files"] and all(name.startswith("2025-11/") for name in state["files"])
+
+    # A file staged by an ingest that has not published yet is not read
+    pd.read_parquet(os.path.join(sales_store.store_dir(), state["files"][0])).to_parquet(
+        os.path.join(sales_store.store_dir(), "2025-11", "part-9999999999999.parquet"), index=False)
+    assert _quantity("2025-11") == 3
+
+    # The tail replaced by the next ingest stays on disk for one more version
+    export["rows"] += [("2025-11-03", "LATTE", 4)]
+    old_tail = state["tail_path"]
+    state = _ingest()
+    assert old_tail in state["retired"] and old_tail not in state["files"]
+    assert os.path.exists(os.path.join(sales_store.store_dir(), old_tail))
+    assert _quantity("2025-11") == 7
+
+    export["rows"] += [("2025-11-04", "LATTE", 8)]
+    _ingest()
+    assert not os.path.exists(os.path.join(sales_store.store_dir(), old_tail))
+    assert _quantity() == 15
+
+
+def test_open_day_stays_in_the_tail(export):
+    export["rows"] = [("2025-11-01", "LATTE", 1), ("2025-11-02", "LATTE", 2), ("2025-11-02", "MOCHA", 3)]
+    state = _ingest()
+    assert state["high_water_mark"] == "2025-11-01"
+    assert state["tail_rows"] == 2 and state["rows"] == 1
+
+    # More invoices on the open day replace the tail; a later day closes it
+    export["rows"] += [("2025-11-02", "LATTE", 4)]
+    state = _ingest()
+    assert state["high_water_mark"] == "2025-11-01" and state["tail_rows"] == 3
+    export["rows"] += [("2025-12-01", "LATTE", 5)]
+    state = _ingest()
+    assert state["high_water_mark"] == "2025-11-02" and state["tail_rows"] == 1
+    assert _quantity("2025-11") == 10 and _quantity("2025-12") == 5
+
+    # Same export again: nothing is read or written
+    assert _ingest()["version"] == state["version"]
+
+
+def test_voided_open_day_drops_the_tail(export):
+    export["rows"] = [("2025-11-01", "LATTE", 1), ("2025-11-02", "LATTE", 2)]
+    _ingest()
+    export["rows"] = export["rows"][:1]
+    state = _ingest()
+    assert state["tail_path"] is None and state["tail_rows"] == 0
+    assert _quantity() == 1
+
+
+def test_back_dated_edit_rebuilds_its_month(export):
+    export["rows"] = [
+        ("2025-10-30", "LATTE", 1), ("2025-10-31", "LATTE", 2),
+        ("2025-11-01", "LATTE", 3), ("2025-11-02", "LATTE", 4), ("2025-11-03", "LATTE", 5),
+    ]
+    _ingest()
+    october = [name for name in sales_store.read_state()["files"] if name.startswith("2025-10/")]
+
+    # A quantity corrected in November and an invoice voided in October, both closed days
+    export["rows"][3] = ("2025-11-02", "LATTE", 40)
+    del export["rows"][0]
+    state = _ingest()
+    assert state["rebuilt_months"] == ["2025-10", "2025-11"]
+    assert _quantity("2025-10") == 2 and _quantity("2025-11") == 48
+    assert state["rows"] == 3 and state["tail_rows"] == 1
+    assert set(october) <= set(state["retired"])
+
+    # Unchanged closed days: the next ingest appends without rebuilding
+    export["rows"] += [("2025-11-04", "LATTE", 6)]
+    state = _ingest()
+    assert state["rebuilt_months"] == []
+    assert _quantity() == 56
@@ -22,14 +22,8 @@ try:
        "source": [
         "# --- RECONCILIATION LOGIC ---\n",
         "\n",
-        "def normalize_name(name):\n",
-        "    if not isinstance(name, str): return \"\"\n",
-        "    # Remove common noise words\n",
-        "    noise = [\"monin\", \"syrup\", \"700ml\", \"1ltr\", \"bottle\", \" \", \"-\"]\n",
-        "    clean = name.lower()\n",
-        "    for n in noise:\n",
-        "        clean = clean.replace(n, \"\")\n",
-        "    return clean\n",
+        "# normalize_name / get_conversion_factor now live in syrup_names.py (vectorized, cached per unique name)\n",
+        "from syrup_names import match_key, litres_per_bottle\n",
         "\n",
         "print(\"Performing Reconciliation...\")\n",
         "\n",
@@ -37,7 +31,7 @@ try:
         "    # 1. Prepare Theoretical (From Sales)\n",
         "    # columns: syrup_name, syrup_liters_deducted\n",
         "    theo_df = syrup_deduction.copy()\n",
-        "    theo_df[\"match_key\"] = theo_df[\"syrup_name\"].apply(normalize_name)\n",
+        "    theo_df[\"match_key\"] = match_key(theo_df[\"syrup_name\"])\n",
         "    \n",
         "    # 2. Prepare Actual (From Inventory)\n",
         "    # columns: Item Name, Consumption (this is in Units/Bottles? No, Inventory is usually in Bottles)\n",
@@ -46,22 +40,13 @@ try:
         "    # Standard Syrup Bottle = 700ML usually, but let's assume 700ML for Monin.\n",
         "    \n",
         "    actual_df = syrup_final.copy()\n",
-        "    actual_df[\"match_key\"] = actual_df[\"Item Name\"].apply(normalize_name)\n",
+        "    actual_df[\"match_key\"] = match_key(actual_df[\"Item Name\"])\n",
         "    \n",
         "    # Convert Actual Consumption (Bottles) to Liters for comparison\n",
         "    # Assumption: 1 Bottle = 0.7 Liters (700ml)\n",
         "    # If UOM says 'LTR', then maybe it's 1. \n",
         "    # Let's try to detect 700ml in name.\n",
-        "    def get_conversion_factor(row):\n",
-        "        name = str(row['Item Name']).lower()\n",
-        "        if '1ltr' in name or '1000ml' in name:\n",
-        "            return 1.0\n",
-        "        if '250ml' in name:\n",
-        "            return 0.25\n",
-        "        # Default Monin\n",
-        "        return 0.7\n",
-        "        \n",
-        "    actual_df[\"conv_factor\"] = actual_df.apply(get_conversion_factor, axis=1)\n",
+        "    actual_df[\"conv_factor\"] = litres_per_bottle(actual_df[\"Item Name\"])\n",
         "    actual_df[\"Actual Liters\"] = actual_df[\"Consumption\"] * actual_df[\"conv_factor\"]\n",
         "    \n",
         "    # 3. Merge\n",
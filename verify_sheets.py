@@ -1,26 +1,22 @@
-import pandas as pd
+import sys
 
-def verify_sheets():
-    sheets = {
-        "Stock Take": "1mKcRWrkCMHXOpofdjU1MrwRmhUGaaET8RUOG6eyHAqA",
-        "Warehouse Issues": "1Cy0A4nQvbaW8GYlqyuiLvob-qed5Lu-GugPNGjSaGF4",
-        "Sales Data": "1WOF03Jicq50xITuKeOvW2I8M-vApAlBSm5IQNLYOuFI"
-    }
+import snapshot_cache
 
-    for name, sheet_id in sheets.items():
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=xlsx"
+def verify_sheets(force_refresh=False):
+    for source, config in snapshot_cache.SOURCES.items():
+        name = config["label"]
         print(f"Checking {name}...")
         try:
-            # For Sales Data, we need to check the specific sheet name "MULLA HOUSE"
-            if name == "Sales Data":
-                df = pd.read_excel(url, sheet_name="MULLA HOUSE")
-            else:
-                df = pd.read_excel(url)
-            
+            # Sheet name ("MULLA HOUSE" for Sales Data) is defined in snapshot_cache.SOURCES
+            df = snapshot_cache.load_source(source, force_refresh=force_refresh)
+
             print(f"  [SUCCESS] Loaded {len(df)} rows.")
-            print(f"  Columns: {list(df.columns)[:5]}...")
+            columns = snapshot_cache.sheet_columns(source) or list(df.columns)
+            print(f"  Columns: {columns[:5]}... ({len(columns)} in the sheet, {len(df.columns)} kept)")
+            print(f"  {snapshot_cache.describe_snapshot(source)}")
         except Exception as e:
             print(f"  [FAILED] Error: {e}")
 
 if __name__ == "__main__":
-    verify_sheets()
+    # Pass --refresh to bypass the snapshot TTL and re-download every sheet
+    verify_sheets(force_refresh="--refresh" in sys.argv)
@@ -1,5 +1,8 @@
 import pandas as pd
 
+import sales_rollup
+import syrup_names
+
 # --- LOGIC PORTED FROM APP.PY ---
 
 def load_data():
@@ -159,15 +162,6 @@ if selected_month:
 
 # --- RECONCILIATION VERIFICATION ---
 
-def normalize_name(name):
-    if not isinstance(name, str): return ""
-    # Remove common noise words
-    noise = ["monin", "syrup", "700ml", "1ltr", "bottle", " ", "-"]
-    clean = name.lower()
-    for n in noise:
-        clean = clean.replace(n, "")
-    return clean
-
 print("\nPerforming Reconciliation Verification...")
 
 # Load Sales
@@ -194,33 +188,25 @@ syrup_recipe = pd.DataFrame([
 syrup_recipe.columns = syrup_recipe.columns.str.lower().str.strip()
 
 # Clean
-sales["item_name_clean"] = sales["item name"].astype(str).str.lower().str.strip()
 syrup_recipe["item_name_clean"] = syrup_recipe["item_name"].str.lower().str.strip()
 
-# Merge
-df_sales = sales.merge(syrup_recipe, on="item_name_clean", how="inner")
-df_sales["syrup_ml_deducted"] = df_sales["qty."] * df_sales["ml_per_cup"]
+# Aggregate sales to (item, category, order type) quantities first, then join the small table
+sales_agg = sales_rollup.rollup_sales(sales)
+df_sales = sales_agg.merge(syrup_recipe, on="item_name_clean", how="inner")
+df_sales["syrup_ml_deducted"] = df_sales["qty"] * df_sales["ml_per_cup"]
 
 syrup_deduction = df_sales.groupby("syrup_name", as_index=False)["syrup_ml_deducted"].sum()
 syrup_deduction["syrup_liters_deducted"] = syrup_deduction["syrup_ml_deducted"] / 1000
 
 # Now Reconcile
 theo_df = syrup_deduction.copy()
-theo_df["match_key"] = theo_df["syrup_name"].apply(normalize_name)
+theo_df["match_key"] = syrup_names.match_key(theo_df["syrup_name"])
 
 actual_df = syrup_final.copy()
 # Reset Filter for verification context if needed, but syrup_final should be ready
-actual_df["match_key"] = actual_df["Item Name"].apply(normalize_name)
-
-def get_conversion_factor(row):
-    name = str(row['Item Name']).lower()
-    if '1ltr' in name or '1000ml' in name:
-        return 1.0
-    if '250ml' in name:
-        return 0.25
-    return 0.7
+actual_df["match_key"] = syrup_names.match_key(actual_df["Item Name"])
 
-actual_df["conv_factor"] = actual_df.apply(get_conversion_factor, axis=1)
+actual_df["conv_factor"] = syrup_names.litres_per_bottle(actual_df["Item Name"])
 actual_df["Actual Liters"] = actual_df["Consumption"] * actual_df["conv_factor"]
 
 merged = pd.merge(actual_df, theo_df, on="match_key", how="outer", suffixes=("_inv", "_recipe"))